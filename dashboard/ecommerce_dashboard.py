@@ -3,48 +3,77 @@ import plotly.express as px
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from src.src.ecommerce_trends import load_data, compute_weekly, find_trending
+from src.src.ecommerce_trends import compute_weekly, find_trending
+from src.src.data_cache import load_data_cached, invalidate, fingerprint
+from src.src.product_index import ProductIndex
+from src.src.schema import with_week_labels
+from src.src.result_cache import cached_call, invalidate_results
+from src.src.instrumentation import timed, registry, perf_panel
+from src.src.exports import download_control
+from src.src.rollup_cube import rollup_sales
 
 st.set_page_config(page_title="Trending Products", layout="wide")
+
+# Wall time of each full script run, for the performance panel
+rerun_timer = timed("rerun").start()
 st.title("Trending Products (E‑Commerce)")
 
 with st.sidebar:
 	st.header("Data")
 	file = st.file_uploader("Upload CSV", type=["csv"])
 	use_sample = st.checkbox("Use sample file", value=True)
+	show_perf = st.checkbox("Show Performance Panel", value=False)
+	if st.button("Reload data"):
+		invalidate()
+		invalidate_results()
 
 if not file and not use_sample:
 	st.info("Upload a CSV or tick 'Use sample file'.")
 	st.stop()
 
 path_or_file = file if file else "data/comprehensive_sales_data.csv"
-df = load_data(path_or_file)
+df = load_data_cached(path_or_file)
 
 st.subheader("Raw data")
-st.dataframe(df.head(30), use_container_width=True)
+with timed("st.dataframe"):
+	st.dataframe(with_week_labels(df.head(30)), use_container_width=True)
 
-weekly = compute_weekly(df)
+# Derived tables are computed once per dataset version and shared by all sessions
+data_version = fingerprint(path_or_file)
+weekly = cached_call(compute_weekly, data_version, df)
+weekly_index = cached_call(ProductIndex, data_version, weekly, sort_by="week")
 st.subheader("Weekly rollup")
-st.dataframe(weekly.head(30), use_container_width=True)
+with timed("st.dataframe"):
+	st.dataframe(with_week_labels(weekly.head(30)), use_container_width=True)
 
-top_up, top_down = find_trending(weekly)
+top_up, top_down = cached_call(find_trending, data_version, weekly, k=10)
 st.subheader("Top Rising Products (latest week)")
-st.dataframe(top_up[["product","week","sales","views","view_to_purchase","trend_score"]],
-use_container_width=True)
+with timed("st.dataframe"):
+	st.dataframe(with_week_labels(top_up[["product","week","sales","views","view_to_purchase","trend_score"]]),
+	use_container_width=True)
 st.subheader("Top Falling Products (latest week)")
-st.dataframe(top_down[["product","week","sales","views","view_to_purchase","trend_score"]],
-use_container_width=True)
+with timed("st.dataframe"):
+	st.dataframe(with_week_labels(top_down[["product","week","sales","views","view_to_purchase","trend_score"]]),
+	use_container_width=True)
 
 st.subheader("Chart a product")
-products = sorted(weekly["product"].unique().tolist())
+products = sorted(weekly_index.products)
 pick = st.selectbox("Pick a product", options=products)
-sub = weekly[weekly["product"] == pick].sort_values("week")
-fig = px.line(sub, x="week", y="sales", markers=True, title=f"{pick} — Weekly Sales")
-st.plotly_chart(fig, use_container_width=True)
+resolution = st.radio("Resolution", ["Weekly", "Daily"], horizontal=True)
+if resolution == "Weekly":
+	sub, x = with_week_labels(weekly_index.rows(pick)), "week"
+else:
+	# daily totals come from the multi-resolution rollup, built once per dataset version
+	rollup = cached_call(rollup_sales, data_version, df)
+	sub, x = rollup.query("bucket", resolution="1D", where={"product": pick}).rename(columns={"bucket": "date"}), "date"
+with timed("plotly.product_sales"):
+	fig = px.line(sub, x=x, y="sales", markers=True, title=f"{pick} — {resolution} Sales")
+	st.plotly_chart(fig, use_container_width=True)
 st.subheader("Export")
-st.download_button(
-"Download weekly dataset (CSV)",
-data=weekly.to_csv(index=False),
-file_name="weekly_trends.csv",
-mime="text/csv"
-)
\ No newline at end of file
+# Serialized only on request, then shared per dataset version and format
+download_control(st, "weekly dataset", "weekly", data_version, lambda: with_week_labels(weekly), "weekly_trends")
+
+rerun_timer.stop()
+registry.maybe_export()
+if show_perf:
+	perf_panel(st.sidebar)
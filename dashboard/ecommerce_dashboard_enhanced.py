@@ -2,12 +2,18 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from src.src.ecommerce_trends import load_data, compute_weekly, find_trending
+from src.src.ecommerce_trends import compute_weekly, find_trending
+from src.src.data_cache import load_data_cached, invalidate, fingerprint
+from src.src.product_index import ProductIndex
+from src.src.schema import with_week_labels, week_labels
+from src.src.result_cache import cached_call, invalidate_results
+from src.src.forecasting import predict_sales_trends
+from src.src.instrumentation import timed, registry, perf_panel
+from src.src.exports import download_control
+from src.src.rollup_cube import rollup_sales
 
 # Enhanced UI Configuration
 st.set_page_config(
@@ -17,6 +23,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Wall time of each full script run, for the performance panel
+rerun_timer = timed("rerun").start()
+
 # Custom CSS for professional styling
 st.markdown("""
 <style>
@@ -66,6 +75,9 @@ with st.sidebar:
     
     file = st.file_uploader("📤 Upload Custom CSV", type=["csv"], 
                           help="Upload your own sales data in CSV format")
+    if st.button("🔄 Reload Data", help="Discard cached data and re-read the source file"):
+        invalidate()
+        invalidate_results()
     
     st.header("⚙️ Analysis Settings")
     prediction_days = st.slider("Prediction Horizon (days)", 7, 90, 30, 
@@ -77,6 +89,7 @@ with st.sidebar:
     st.header("📊 Display Options")
     show_raw_data = st.checkbox("Show Raw Data", value=False)
     show_weekly_data = st.checkbox("Show Weekly Aggregations", value=True)
+    show_perf = st.checkbox("Show Performance Panel", value=False)
 
 # Data loading and validation
 if not file and not use_sample:
@@ -86,7 +99,7 @@ if not file and not use_sample:
 # Load data
 try:
     path_or_file = file if file else "data/comprehensive_sales_data.csv"
-    df = load_data(path_or_file)
+    df = load_data_cached(path_or_file)
     
     # Calculate basic metrics for dashboard
     total_sales = df['sales'].sum()
@@ -98,41 +111,6 @@ except Exception as e:
     st.error(f"❌ Error loading data: {str(e)}")
     st.stop()
 
-# Enhanced predictive analytics function
-def predict_sales_trends(weekly_data, days_to_predict=30, confidence=0.9):
-    """Enhanced prediction using simple exponential smoothing with confidence intervals"""
-    predictions = {}
-    
-    for product in weekly_data['product'].unique():
-        product_data = weekly_data[weekly_data['product'] == product].sort_values('week')
-        
-        if len(product_data) >= 4:  # Minimum data points for prediction
-            sales_series = product_data['sales'].values
-            
-            # Simple exponential smoothing prediction
-            alpha = 0.3
-            predictions_list = []
-            last_value = sales_series[-1]
-            
-            for _ in range(days_to_predict // 7):  # Convert days to weeks
-                next_pred = alpha * last_value + (1 - alpha) * (last_value if not predictions_list else predictions_list[-1])
-                predictions_list.append(next_pred)
-                last_value = next_pred
-            
-            # Calculate confidence intervals
-            std_dev = np.std(sales_series[-4:]) if len(sales_series) >= 4 else sales_series.std()
-            upper_bound = [p + (std_dev * (1 - confidence)) for p in predictions_list]
-            lower_bound = [p - (std_dev * (1 - confidence)) for p in predictions_list]
-            
-            predictions[product] = {
-                'predictions': predictions_list,
-                'upper_bound': upper_bound,
-                'lower_bound': lower_bound,
-                'confidence': confidence
-            }
-    
-    return predictions
-
 # Main dashboard layout
 col1, col2, col3, col4 = st.columns(4)
 
@@ -168,16 +146,19 @@ with col4:
     </div>
     """, unsafe_allow_html=True)
 
-# Data processing
-weekly = compute_weekly(df)
-top_up, top_down = find_trending(weekly)
+# Data processing: computed once per dataset version and parameters, shared by all sessions
+data_version = fingerprint(path_or_file)
+weekly = cached_call(compute_weekly, data_version, df)
+weekly_index = cached_call(ProductIndex, data_version, weekly, sort_by='week')
+top_up, top_down = cached_call(find_trending, data_version, weekly, k=10)
 
 # Prediction section
 if show_predictions:
     st.markdown("---")
     st.header("🔮 Predictive Analytics")
     
-    predictions = predict_sales_trends(weekly, prediction_days, confidence_level/100)
+    predictions = cached_call(predict_sales_trends, data_version, weekly,
+                              days_to_predict=prediction_days, confidence=confidence_level/100)
     
     if predictions:
         col1, col2 = st.columns(2)
@@ -204,44 +185,45 @@ if show_predictions:
         
         if selected_product:
             product_data = predictions[selected_product]
-            fig = go.Figure()
+            with timed("plotly.prediction"):
+                fig = go.Figure()
             
-            # Add historical data
-            hist_data = weekly[weekly['product'] == selected_product].sort_values('week')
-            fig.add_trace(go.Scatter(
-                x=hist_data['week'], 
-                y=hist_data['sales'],
-                name='Historical Sales',
-                line=dict(color='#1f77b4', width=3)
-            ))
+                # Add historical data
+                hist_data = weekly_index.rows(selected_product)
+                fig.add_trace(go.Scatter(
+                    x=week_labels(hist_data['week']), 
+                    y=hist_data['sales'],
+                    name='Historical Sales',
+                    line=dict(color='#1f77b4', width=3)
+                ))
             
-            # Add predictions
-            future_weeks = [f"Week {i+1}" for i in range(len(product_data['predictions']))]
-            fig.add_trace(go.Scatter(
-                x=future_weeks,
-                y=product_data['predictions'],
-                name='Predicted Sales',
-                line=dict(color='#ff7f0e', width=3, dash='dash')
-            ))
+                # Add predictions
+                future_weeks = [f"Week {i+1}" for i in range(len(product_data['predictions']))]
+                fig.add_trace(go.Scatter(
+                    x=future_weeks,
+                    y=product_data['predictions'],
+                    name='Predicted Sales',
+                    line=dict(color='#ff7f0e', width=3, dash='dash')
+                ))
             
-            # Add confidence interval
-            fig.add_trace(go.Scatter(
-                x=future_weeks + future_weeks[::-1],
-                y=product_data['upper_bound'] + product_data['lower_bound'][::-1],
-                fill='toself',
-                fillcolor='rgba(255, 127, 14, 0.2)',
-                line=dict(color='rgba(255,255,255,0)'),
-                name=f'{confidence_level}% Confidence'
-            ))
+                # Add confidence interval
+                fig.add_trace(go.Scatter(
+                    x=future_weeks + future_weeks[::-1],
+                    y=product_data['upper_bound'] + product_data['lower_bound'][::-1],
+                    fill='toself',
+                    fillcolor='rgba(255, 127, 14, 0.2)',
+                    line=dict(color='rgba(255,255,255,0)'),
+                    name=f'{confidence_level}% Confidence'
+                ))
             
-            fig.update_layout(
-                title=f"Sales Prediction for {selected_product}",
-                xaxis_title="Time",
-                yaxis_title="Sales",
-                hovermode='x unified'
-            )
+                fig.update_layout(
+                    title=f"Sales Prediction for {selected_product}",
+                    xaxis_title="Time",
+                    yaxis_title="Sales",
+                    hovermode='x unified'
+                )
             
-            st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(fig, use_container_width=True)
 
 # Trending products section
 st.markdown("---")
@@ -285,76 +267,101 @@ with col2:
 if show_raw_data:
     st.markdown("---")
     st.header("📋 Raw Data Overview")
-    st.dataframe(df.head(50), use_container_width=True, height=300)
+    with timed("st.dataframe"):
+        st.dataframe(with_week_labels(df.head(50)), use_container_width=True, height=300)
 
 if show_weekly_data:
     st.markdown("---")
     st.header("📅 Weekly Aggregations")
-    st.dataframe(weekly.head(50), use_container_width=True, height=300)
+    with timed("st.dataframe"):
+        st.dataframe(with_week_labels(weekly.head(50)), use_container_width=True, height=300)
 
 # Product analysis section
 st.markdown("---")
 st.header("🔍 Product Analysis")
 
-products = sorted(weekly["product"].unique().tolist())
+products = sorted(weekly_index.products)
 selected_product = st.selectbox("Select Product for Detailed Analysis", options=products)
+resolution = st.radio("Resolution", ["Weekly", "Daily"], horizontal=True)
 
 if selected_product:
-    product_data = weekly[weekly["product"] == selected_product].sort_values("week")
+    if resolution == "Weekly":
+        product_data, period = with_week_labels(weekly_index.rows(selected_product)), "week"
+    else:
+        # Daily totals come from the multi-resolution rollup, built once per dataset version
+        rollup = cached_call(rollup_sales, data_version, df)
+        product_data = rollup.query("bucket", resolution="1D", where={"product": selected_product})
+        product_data = product_data.rename(columns={"bucket": "date"})
+        product_data["view_to_purchase"] = (product_data["views"] / product_data["sales"]).where(product_data["sales"] > 0)
+        period = "date"
     
     col1, col2 = st.columns(2)
     
     with col1:
         # Sales trend chart
-        fig_sales = px.line(product_data, x="week", y="sales", 
-                          title=f"{selected_product} - Sales Trend",
-                          markers=True)
-        fig_sales.update_traces(line=dict(width=3))
-        st.plotly_chart(fig_sales, use_container_width=True)
+        with timed("plotly.sales"):
+            fig_sales = px.line(product_data, x=period, y="sales", 
+                              title=f"{selected_product} - Sales Trend",
+                              markers=True)
+            fig_sales.update_traces(line=dict(width=3))
+            st.plotly_chart(fig_sales, use_container_width=True)
     
     with col2:
         # Conversion rate chart
-        fig_conversion = px.line(product_data, x="week", y="view_to_purchase",
-                               title=f"{selected_product} - Conversion Rate",
-                               markers=True)
-        fig_conversion.update_traces(line=dict(width=3, color='#2ca02c'))
-        st.plotly_chart(fig_conversion, use_container_width=True)
+        with timed("plotly.conversion"):
+            fig_conversion = px.line(product_data, x=period, y="view_to_purchase",
+                                   title=f"{selected_product} - Conversion Rate",
+                                   markers=True)
+            fig_conversion.update_traces(line=dict(width=3, color='#2ca02c'))
+            st.plotly_chart(fig_conversion, use_container_width=True)
 
 # Export functionality
+# (files are serialized only when requested, then cached per dataset version and format)
 st.markdown("---")
 st.header("💾 Export Results")
 
 col1, col2 = st.columns(2)
 
 with col1:
-    st.download_button(
-        "📥 Download Weekly Data (CSV)",
-        data=weekly.to_csv(index=False),
-        file_name="weekly_ecommerce_data.csv",
-        mime="text/csv",
+    download_control(
+        st,
+        "Weekly Data",
+        "weekly",
+        data_version,
+        lambda: with_week_labels(weekly),
+        "weekly_ecommerce_data",
         help="Download the aggregated weekly data"
     )
 
 with col2:
-    if predictions:
-        prediction_df = pd.DataFrame([
-            {
-                'product': product,
-                'predicted_sales': data['predictions'][-1],
-                'growth_percentage': ((data['predictions'][-1] - data['predictions'][0]) / data['predictions'][0] * 100),
-                'confidence_level': f"{data['confidence']*100:.0f}%"
-            }
-            for product, data in predictions.items()
-        ])
-        
-        st.download_button(
-            "📊 Download Predictions (CSV)",
-            data=prediction_df.to_csv(index=False),
-            file_name="sales_predictions.csv",
-            mime="text/csv",
+    if show_predictions and predictions:
+        def prediction_frame():
+            return pd.DataFrame([
+                {
+                    'product': product,
+                    'predicted_sales': data['predictions'][-1],
+                    'growth_percentage': ((data['predictions'][-1] - data['predictions'][0]) / data['predictions'][0] * 100),
+                    'confidence_level': f"{data['confidence']*100:.0f}%"
+                }
+                for product, data in predictions.items()
+            ])
+
+        download_control(
+            st,
+            "Predictions",
+            "predictions",
+            data_version,
+            prediction_frame,
+            "sales_predictions",
+            key_params={'days': prediction_days, 'confidence': confidence_level},
             help="Download the sales predictions data"
         )
 
 # Footer
 st.markdown("---")
 st.caption("🔄 Data updated automatically | 📧 Support: analytics@ecommerce.com")
+
+rerun_timer.stop()
+registry.maybe_export()
+if show_perf:
+    perf_panel(st.sidebar)
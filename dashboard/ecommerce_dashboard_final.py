@@ -1,12 +1,17 @@
 import streamlit as st
 import plotly.express as px
-import plotly.graph_objects as go
-import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.src.schema import schema_for
+from src.src.downsampling import CHART_RANGES, downsample_window
+from src.src.trend_engine import TrendEngine
+from src.src.trend_detectors import TrendDetectors
+from src.src.simulator import generate_trend_ticks
+from src.src.live import start_run, finish_run, start_feed, frequency_slider, live_status
+from src.src.rollup_cube import RollupCube
+from src.src.instrumentation import timed
 
 # Comprehensive UI Configuration
 st.set_page_config(
@@ -15,6 +20,8 @@ st.set_page_config(
     page_icon="📊"
 )
 
+rerun_timer = start_run()
+
 # Custom CSS for professional styling
 st.markdown("""
 <style>
@@ -81,15 +88,11 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+REAL_TIME_COLUMNS = schema_for('timestamp', 'product', 'category', 'sales', 'views', 'price')
+
 # Initialize session state
-if 'real_time_data' not in st.session_state:
-    st.session_state.real_time_data = pd.DataFrame(columns=['timestamp', 'product', 'category', 'sales', 'views', 'price'])
-if 'last_update' not in st.session_state:
-    st.session_state.last_update = datetime.now()
 if 'selected_product' not in st.session_state:
     st.session_state.selected_product = None
-if 'trend_analysis' not in st.session_state:
-    st.session_state.trend_analysis = {}
 
 # Product catalog with categories
 PRODUCT_CATALOG = {
@@ -112,282 +115,307 @@ PRODUCT_CATALOG = {
 }
 
 # Function to generate realistic data with trends
-def generate_real_time_data_with_trends():
-    """Generate data with embedded trends for analysis"""
-    current_time = datetime.now()
-    new_data = []
-    
-    # Define trending products (manually set for demonstration)
-    trending_products = {
-        'iPhone 15 Pro': 1.8,  # 80% uplift
-        'Gaming Laptop': 1.5,  # 50% uplift
-        'Smart TV 55"': 0.7,   # 30% decline
-        'Coffee Maker': 0.6    # 40% decline
-    }
-    
-    for category, products in PRODUCT_CATALOG.items():
-        for product in products:
-            # Base values
-            base_sales = np.random.randint(5, 30)
-            base_views = int(base_sales * np.random.uniform(8, 20))
-            base_price = np.random.choice([199, 299, 399, 499, 699, 899, 1099, 1299])
-            
-            # Apply trend if product is in trending list
-            trend_factor = trending_products.get(product, 1.0)
-            sales = int(base_sales * trend_factor * (0.8 + np.random.random() * 0.4))
-            views = int(base_views * (0.9 + np.random.random() * 0.2))
-            price = base_price * (0.95 + np.random.random() * 0.1)
-            
-            new_data.append({
-                'timestamp': current_time,
-                'product': product,
-                'category': category,
-                'sales': max(1, sales),
-                'views': max(views, sales * 5),
-                'price': round(price, 2)
-            })
-    
-    return pd.DataFrame(new_data)
+# Trending products (manually set for demonstration)
+TRENDING_PRODUCTS = {
+    'iPhone 15 Pro': 1.8,  # 80% uplift
+    'Gaming Laptop': 1.5,  # 50% uplift
+    'Smart TV 55"': 0.7,   # 30% decline
+    'Coffee Maker': 0.6    # 40% decline
+}
 
-# Trend detection algorithm
-def detect_trends(data):
-    """Advanced trend detection using moving averages and statistical analysis"""
-    trends = {}
-    
-    for product in data['product'].unique():
-        product_data = data[data['product'] == product].sort_values('timestamp')
-        
-        if len(product_data) >= 5:  # Need enough data points
-            sales_series = product_data['sales'].values
-            
-            # Calculate moving averages
-            short_ma = np.mean(sales_series[-3:]) if len(sales_series) >= 3 else sales_series[-1]
-            long_ma = np.mean(sales_series[-5:]) if len(sales_series) >= 5 else sales_series[-1]
-            
-            # Trend calculation
-            trend_score = (short_ma - long_ma) / long_ma if long_ma > 0 else 0
-            
-            # Categorize trend
-            if trend_score > 0.2:
-                trend_status = "🚀 Rapid Growth"
-                trend_class = "trend-up"
-            elif trend_score > 0.05:
-                trend_status = "📈 Growing"
-                trend_class = "trend-up"
-            elif trend_score < -0.2:
-                trend_status = "📉 Rapid Decline"
-                trend_class = "trend-down"
-            elif trend_score < -0.05:
-                trend_status = "🔻 Declining"
-                trend_class = "trend-down"
-            else:
-                trend_status = "➡️ Stable"
-                trend_class = "trend-neutral"
-            
-            trends[product] = {
-                'trend_score': trend_score,
-                'trend_status': trend_status,
-                'trend_class': trend_class,
-                'short_ma': short_ma,
-                'long_ma': long_ma,
-                'current_sales': sales_series[-1]
-            }
-    
-    return trends
+def generate_real_time_data_with_trends(rng):
+    """Generate one tick for the whole catalog with embedded trends for analysis"""
+    return generate_trend_ticks(PRODUCT_CATALOG, trending_products=TRENDING_PRODUCTS, rng=rng)
+
+# Convert frequency to seconds
+frequency_map = {
+    "5 seconds": 5,
+    "10 seconds": 10,
+    "30 seconds": 30,
+    "1 minute": 60,
+    "5 minutes": 300
+}
+DEFAULT_FREQUENCY = "10 seconds"
+
+@st.cache_resource
+def live_feed():
+    """Background ticker, bounded live history, trend engines and category rollup shared by every session of this dashboard"""
+    # Rolling 3-vs-5 point moving averages per product, updated as ticks arrive
+    trend_engine = TrendEngine(short_window=3, long_window=5)
+    # EWMA crossover, CUSUM change points and hour-of-day z-scores per product
+    detectors = TrendDetectors()
+    # Category x product x minute sums, kept in step with the history
+    cube = RollupCube(
+        ('category', 'product'),
+        {'sales': 'sales', 'views': 'views', 'revenue': lambda batch: batch['sales'] * batch['price']},
+        bucket='1min',
+        dtypes=REAL_TIME_COLUMNS
+    )
+    rng = np.random.default_rng()
+
+    def on_tick(batch, history):
+        trend_engine.observe(batch['product'], batch['sales'])
+        detectors.observe(batch['product'], batch['sales'], batch['timestamp'])
+        cube.update(batch).retain(len(history))
+
+    feed, source = start_feed(
+        REAL_TIME_COLUMNS,
+        lambda: generate_real_time_data_with_trends(rng),
+        frequency_map[DEFAULT_FREQUENCY],
+        on_tick=on_tick
+    )
+    return feed, source, trend_engine, detectors, cube
+
+feed, source, trend_engine, detectors, cube = live_feed()
 
 # Sidebar controls
 with st.sidebar:
     st.header("⚙️ Dashboard Controls")
     
-    update_frequency = st.select_slider(
-        "📅 Update Frequency",
-        options=["5 seconds", "10 seconds", "30 seconds", "1 minute", "5 minutes"],
-        value="10 seconds"
-    )
+    # Live fragments refresh at the shared feed's rate
+    update_interval = frequency_slider(feed, frequency_map, "📅 Update Frequency")
     
     st.header("📊 Display Options")
     show_trend_analysis = st.checkbox("Show Trend Analysis", value=True)
     show_product_metrics = st.checkbox("Show Product Metrics", value=True)
     show_category_analysis = st.checkbox("Show Category Analysis", value=True)
+    show_perf = st.checkbox("Show Performance Panel", value=False)
+    chart_range = st.select_slider(
+        "Chart Time Range",
+        options=list(CHART_RANGES),
+        value="24 hours"
+    )
 
-# Convert frequency to seconds
-frequency_map = {
-    "5 seconds": 5,
-    "10 seconds": 10,
-    "30 seconds": 30,
-    "1 minute": 60,
-    "5 minutes": 300
-}
-update_interval = frequency_map[update_frequency]
+chart_window = CHART_RANGES[chart_range]
+
+def current_trends():
+    """Trend snapshot of the shared engine"""
+    with feed.lock:
+        return trend_engine.trends()
+
+def current_alerts():
+    """Products the streaming detectors flagged over the last few ticks"""
+    with feed.lock:
+        return detectors.alerts(within=3)
+
+def live_frame():
+    """Shared history with revenue, rebuilt only when new ticks arrive"""
+    if st.session_state.get('live_frame_version') != feed.version:
+        df = feed.frame().copy()
+        df['revenue'] = df['sales'] * df['price']
+        st.session_state.live_frame = df
+        st.session_state.live_frame_version = feed.version
+    return st.session_state.live_frame
 
 # Data update logic
-if st.button("🔄 Refresh Data & Trends") or (datetime.now() - st.session_state.last_update).seconds >= update_interval:
-    new_data = generate_real_time_data_with_trends()
-    st.session_state.real_time_data = pd.concat([st.session_state.real_time_data, new_data], ignore_index=True)
-    st.session_state.trend_analysis = detect_trends(st.session_state.real_time_data)
-    st.session_state.last_update = datetime.now()
-    st.rerun()
+# (ticks come from the background feed; the live sections below are
+# fragments that re-read it on their own timer)
+if st.button("🔄 Refresh Data & Trends"):
+    feed.tick()
 
 # Overview metrics
-if not st.session_state.real_time_data.empty:
-    df = st.session_state.real_time_data.copy()
-    df['sales'] = pd.to_numeric(df['sales'], errors='coerce')
-    df['price'] = pd.to_numeric(df['price'], errors='coerce')
-    df['revenue'] = df['sales'] * df['price']
+@st.fragment(run_every=update_interval)
+@timed("fragment.live_overview")
+def live_overview():
+    if not feed.buffer.empty:
+        df = live_frame()
     
-    st.header("📈 Business Overview")
+        st.header("📈 Business Overview")
     
-    col1, col2, col3, col4 = st.columns(4)
+        col1, col2, col3, col4 = st.columns(4)
     
-    with col1:
-        total_revenue = df['revenue'].sum()
-        st.metric("💰 Total Revenue", f"${total_revenue:,.0f}")
+        with col1:
+            total_revenue = df['revenue'].sum()
+            st.metric("💰 Total Revenue", f"${total_revenue:,.0f}")
     
-    with col2:
-        total_units = df['sales'].sum()
-        st.metric("📦 Units Sold", f"{total_units:,.0f}")
+        with col2:
+            total_units = df['sales'].sum()
+            st.metric("📦 Units Sold", f"{total_units:,.0f}")
     
-    with col3:
-        avg_order = total_revenue / total_units if total_units > 0 else 0
-        st.metric("🧾 Avg Order Value", f"${avg_order:,.2f}")
+        with col3:
+            avg_order = total_revenue / total_units if total_units > 0 else 0
+            st.metric("🧾 Avg Order Value", f"${avg_order:,.2f}")
     
-    with col4:
-        unique_products = df['product'].nunique()
-        st.metric("🎯 Active Products", f"{unique_products}")
+        with col4:
+            unique_products = df['product'].nunique()
+            st.metric("🎯 Active Products", f"{unique_products}")
+
+live_overview()
 
 # Trend analysis section
-if show_trend_analysis and st.session_state.trend_analysis:
-    st.header("🔍 AI-Powered Trend Detection")
+@st.fragment(run_every=update_interval)
+@timed("fragment.live_trends")
+def live_trends():
+    trend_analysis = current_trends()
+    if show_trend_analysis and trend_analysis:
+        st.header("🔍 AI-Powered Trend Detection")
     
-    # Top rising products
-    rising_products = {k: v for k, v in st.session_state.trend_analysis.items() if v['trend_score'] > 0}
-    declining_products = {k: v for k, v in st.session_state.trend_analysis.items() if v['trend_score'] < 0}
+        # Top rising products
+        rising_products = {k: v for k, v in trend_analysis.items() if v['trend_score'] > 0}
+        declining_products = {k: v for k, v in trend_analysis.items() if v['trend_score'] < 0}
     
-    col1, col2 = st.columns(2)
+        col1, col2 = st.columns(2)
     
-    with col1:
-        st.subheader("🚀 Top Rising Products")
-        if rising_products:
-            sorted_rising = sorted(rising_products.items(), key=lambda x: x[1]['trend_score'], reverse=True)
-            for product, analysis in sorted_rising[:5]:
-                trend_percent = analysis['trend_score'] * 100
-                st.markdown(f"""
-                <div class="product-card">
-                    <h4>{product}</h4>
-                    <p>Trend: <span class="trend-badge {analysis['trend_class']}">+{trend_percent:+.1f}%</span></p>
-                    <p>Status: {analysis['trend_status']}</p>
-                    <p>Current Sales: {analysis['current_sales']} units</p>
-                </div>
-                """, unsafe_allow_html=True)
-                if st.button(f"Analyze {product}", key=f"analyze_{product}"):
-                    st.session_state.selected_product = product
-                    st.rerun()
-        else:
-            st.info("No rising trends detected")
+        with col1:
+            st.subheader("🚀 Top Rising Products")
+            if rising_products:
+                sorted_rising = sorted(rising_products.items(), key=lambda x: x[1]['trend_score'], reverse=True)
+                for product, analysis in sorted_rising[:5]:
+                    trend_percent = analysis['trend_score'] * 100
+                    st.markdown(f"""
+                    <div class="product-card">
+                        <h4>{product}</h4>
+                        <p>Trend: <span class="trend-badge {analysis['trend_class']}">+{trend_percent:+.1f}%</span></p>
+                        <p>Status: {analysis['trend_status']}</p>
+                        <p>Current Sales: {analysis['current_sales']} units</p>
+                    </div>
+                    """, unsafe_allow_html=True)
+                    if st.button(f"Analyze {product}", key=f"analyze_{product}"):
+                        st.session_state.selected_product = product
+                        st.rerun()
+            else:
+                st.info("No rising trends detected")
     
-    with col2:
-        st.subheader("📉 Top Declining Products")
-        if declining_products:
-            sorted_declining = sorted(declining_products.items(), key=lambda x: x[1]['trend_score'])
-            for product, analysis in sorted_declining[:5]:
-                trend_percent = analysis['trend_score'] * 100
-                st.markdown(f"""
-                <div class="product-card">
-                    <h4>{product}</h4>
-                    <p>Trend: <span class="trend-badge {analysis['trend_class']}">{trend_percent:+.1f}%</span></p>
-                    <p>Status: {analysis['trend_status']}</p>
-                    <p>Current Sales: {analysis['current_sales']} units</p>
-                </div>
-                """, unsafe_allow_html=True)
-                if st.button(f"Analyze {product}", key=f"analyze_dec_{product}"):
-                    st.session_state.selected_product = product
-                    st.rerun()
+        with col2:
+            st.subheader("📉 Top Declining Products")
+            if declining_products:
+                sorted_declining = sorted(declining_products.items(), key=lambda x: x[1]['trend_score'])
+                for product, analysis in sorted_declining[:5]:
+                    trend_percent = analysis['trend_score'] * 100
+                    st.markdown(f"""
+                    <div class="product-card">
+                        <h4>{product}</h4>
+                        <p>Trend: <span class="trend-badge {analysis['trend_class']}">{trend_percent:+.1f}%</span></p>
+                        <p>Status: {analysis['trend_status']}</p>
+                        <p>Current Sales: {analysis['current_sales']} units</p>
+                    </div>
+                    """, unsafe_allow_html=True)
+                    if st.button(f"Analyze {product}", key=f"analyze_dec_{product}"):
+                        st.session_state.selected_product = product
+                        st.rerun()
+            else:
+                st.info("No declining trends detected")
+
+        # Change points and unusual hours from the streaming detectors
+        st.subheader("🧭 Change Detection")
+        alerts = current_alerts()
+        if alerts.empty:
+            st.info("No change points or unusual sales detected")
         else:
-            st.info("No declining trends detected")
+            alerts['signal'] = np.select(
+                [alerts['since_change'].between(0, 2), alerts['since_cross'].between(0, 2)],
+                [np.where(alerts['change'] > 0, "📈 Shift up", "📉 Shift down"),
+                 np.where(alerts['cross'] > 0, "⤴️ EWMA crossed up", "⤵️ EWMA crossed down")],
+                default="⚠️ Unusual for this hour of day"
+            )
+            with timed("st.dataframe"):
+                st.dataframe(
+                    alerts[['product', 'signal', 'value', 'fast', 'slow', 'seasonal_z', 'changes']].head(20).round(2),
+                    hide_index=True,
+                    use_container_width=True
+                )
+
+live_trends()
 
 # Category analysis
-if show_category_analysis and not st.session_state.real_time_data.empty:
-    st.header("🏷️ Category Performance")
+@st.fragment(run_every=update_interval)
+@timed("fragment.live_categories")
+def live_categories():
+    if show_category_analysis and not feed.buffer.empty:
+        st.header("🏷️ Category Performance")
     
-    category_performance = df.groupby('category').agg({
-        'sales': 'sum',
-        'revenue': 'sum',
-        'product': 'nunique'
-    }).reset_index()
+        # Answered from the maintained rollup instead of a scan of the history
+        with feed.lock:
+            category_performance = cube.query('category', distinct='product').astype({'sales': 'int64'})
     
-    col1, col2 = st.columns(2)
+        col1, col2 = st.columns(2)
     
-    with col1:
-        fig_category_sales = px.bar(
-            category_performance,
-            x='category',
-            y='sales',
-            title='Sales by Category',
-            color='sales',
-            text_auto=True
-        )
-        st.plotly_chart(fig_category_sales, use_container_width=True)
+        with col1:
+            with timed("plotly.category_sales"):
+                fig_category_sales = px.bar(
+                    category_performance,
+                    x='category',
+                    y='sales',
+                    title='Sales by Category',
+                    color='sales',
+                    text_auto=True
+                )
+                st.plotly_chart(fig_category_sales, use_container_width=True)
     
-    with col2:
-        fig_category_revenue = px.pie(
-            category_performance,
-            names='category',
-            values='revenue',
-            title='Revenue Distribution by Category'
-        )
-        st.plotly_chart(fig_category_revenue, use_container_width=True)
+        with col2:
+            with timed("plotly.category_revenue"):
+                fig_category_revenue = px.pie(
+                    category_performance,
+                    names='category',
+                    values='revenue',
+                    title='Revenue Distribution by Category'
+                )
+                st.plotly_chart(fig_category_revenue, use_container_width=True)
+
+live_categories()
 
 # Product drill-down
-if st.session_state.selected_product and not st.session_state.real_time_data.empty:
-    st.header(f"🔍 Detailed Analysis: {st.session_state.selected_product}")
+@st.fragment(run_every=update_interval)
+@timed("fragment.live_product_detail")
+def live_product_detail():
+    df = live_frame()
+    if st.session_state.selected_product and not feed.buffer.empty:
+        st.header(f"🔍 Detailed Analysis: {st.session_state.selected_product}")
     
-    product_data = df[df['product'] == st.session_state.selected_product].copy()
+        # The history changes every tick, so a mask over its categorical product codes
+        # is cheaper than rebuilding a per-product index for one lookup
+        product_data = df[df['product'] == st.session_state.selected_product].copy()
     
-    if not product_data.empty:
-        # Product metrics
-        col1, col2, col3, col4 = st.columns(4)
+        if not product_data.empty:
+            # Product metrics
+            col1, col2, col3, col4 = st.columns(4)
         
-        with col1:
-            total_sales = product_data['sales'].sum()
-            st.metric("Total Sales", f"{total_sales:,.0f} units")
+            with col1:
+                total_sales = product_data['sales'].sum()
+                st.metric("Total Sales", f"{total_sales:,.0f} units")
         
-        with col2:
-            total_revenue = product_data['revenue'].sum()
-            st.metric("Total Revenue", f"${total_revenue:,.0f}")
+            with col2:
+                total_revenue = product_data['revenue'].sum()
+                st.metric("Total Revenue", f"${total_revenue:,.0f}")
         
-        with col3:
-            avg_price = product_data['price'].mean()
-            st.metric("Average Price", f"${avg_price:,.2f}")
+            with col3:
+                avg_price = product_data['price'].mean()
+                st.metric("Average Price", f"${avg_price:,.2f}")
         
-        with col4:
-            if st.session_state.selected_product in st.session_state.trend_analysis:
-                trend = st.session_state.trend_analysis[st.session_state.selected_product]
-                st.metric("Trend Score", f"{trend['trend_score']*100:+.1f}%")
+            with col4:
+                trend_analysis = current_trends()
+                if st.session_state.selected_product in trend_analysis:
+                    trend = trend_analysis[st.session_state.selected_product]
+                    st.metric("Trend Score", f"{trend['trend_score']*100:+.1f}%")
         
-        # Product charts
-        col1, col2 = st.columns(2)
+            # Product charts
+            col1, col2 = st.columns(2)
         
-        with col1:
-            sales_trend = product_data.groupby('timestamp')['sales'].sum().reset_index()
-            fig_sales = px.line(
-                sales_trend,
-                x='timestamp',
-                y='sales',
-                title=f'Sales Trend - {st.session_state.selected_product}',
-                markers=True
-            )
-            st.plotly_chart(fig_sales, use_container_width=True)
+            with col1:
+                sales_trend = downsample_window(product_data.groupby('timestamp')['sales'].sum().reset_index(), 'sales', chart_window)
+                with timed("plotly.sales"):
+                    fig_sales = px.line(
+                        sales_trend,
+                        x='timestamp',
+                        y='sales',
+                        title=f'Sales Trend - {st.session_state.selected_product}',
+                        markers=True
+                    )
+                    st.plotly_chart(fig_sales, use_container_width=True)
         
-        with col2:
-            price_trend = product_data.groupby('timestamp')['price'].mean().reset_index()
-            fig_price = px.line(
-                price_trend,
-                x='timestamp',
-                y='price',
-                title=f'Price Movement - {st.session_state.selected_product}',
-                markers=True
-            )
-            st.plotly_chart(fig_price, use_container_width=True)
+            with col2:
+                price_trend = downsample_window(product_data.groupby('timestamp')['price'].mean().reset_index(), 'price', chart_window)
+                with timed("plotly.price"):
+                    fig_price = px.line(
+                        price_trend,
+                        x='timestamp',
+                        y='price',
+                        title=f'Price Movement - {st.session_state.selected_product}',
+                        markers=True
+                    )
+                    st.plotly_chart(fig_price, use_container_width=True)
+
+live_product_detail()
 
 # Business insights
 st.header("💡 AI-Generated Insights")
@@ -404,5 +432,9 @@ st.markdown("""
 
 # Footer
 st.markdown("---")
-st.caption(f"🔄 Last update: {st.session_state.last_update.strftime('%Y-%m-%d %H:%M:%S')}")
+
+live_status(feed, source, update_interval)
+
 st.caption("📈 AI-powered trend detection | 🚀 Real-time analytics | 💡 Actionable insights")
+
+finish_run(rerun_timer, update_interval, show_perf)
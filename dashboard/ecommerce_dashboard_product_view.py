@@ -1,12 +1,14 @@
 import streamlit as st
 import plotly.express as px
-import plotly.graph_objects as go
-import pandas as pd
 import numpy as np
-from datetime import datetime
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.src.schema import schema_for
+from src.src.downsampling import CHART_RANGES, downsample_window
+from src.src.simulator import generate_real_time_ticks
+from src.src.live import start_run, finish_run, start_feed, frequency_slider, live_status
+from src.src.instrumentation import timed
 
 # Real-time UI Configuration
 st.set_page_config(
@@ -15,6 +17,8 @@ st.set_page_config(
     page_icon="📊"
 )
 
+rerun_timer = start_run()
+
 # Custom CSS for enhanced styling
 st.markdown("""
 <style>
@@ -67,55 +71,29 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+REAL_TIME_COLUMNS = schema_for('timestamp', 'product', 'sales', 'views', 'price')
+
 # Initialize session state
-if 'real_time_data' not in st.session_state:
-    st.session_state.real_time_data = pd.DataFrame(columns=['timestamp', 'product', 'sales', 'views', 'price'])
-if 'last_update' not in st.session_state:
-    st.session_state.last_update = datetime.now()
 if 'selected_product' not in st.session_state:
     st.session_state.selected_product = None
 
 # Function to generate real-time data with more products
-def generate_real_time_data():
-    """Generate fluctuating real-time data for multiple products"""
-    current_time = datetime.now()
-    products = [
-        'iPhone 15 Pro', 'Samsung Galaxy S24', 'MacBook Pro', 'iPad Air',
-        'AirPods Pro', 'Apple Watch', 'PlayStation 5', 'Xbox Series X',
-        'Nintendo Switch', 'Smart TV 55"', 'Wireless Headphones', 'Gaming Laptop'
-    ]
-    
-    new_data = []
-    for product in products:
-        # Generate realistic product data
-        base_price = np.random.choice([299, 399, 499, 699, 899, 1099, 1299])
-        sales = np.random.randint(1, 50)
-        views = int(sales * np.random.uniform(5, 15))
-        price = base_price * (0.9 + np.random.random() * 0.2)  # Price fluctuations
-        
-        new_data.append({
-            'timestamp': current_time,
-            'product': product,
-            'sales': sales,
-            'views': views,
-            'price': round(price, 2)
-        })
-    
-    return pd.DataFrame(new_data)
+PRODUCTS = [
+    'iPhone 15 Pro', 'Samsung Galaxy S24', 'MacBook Pro', 'iPad Air',
+    'AirPods Pro', 'Apple Watch', 'PlayStation 5', 'Xbox Series X',
+    'Nintendo Switch', 'Smart TV 55"', 'Wireless Headphones', 'Gaming Laptop'
+]
 
-# Sidebar for controls
-with st.sidebar:
-    st.header("⚡ Dashboard Controls")
-    update_frequency = st.select_slider(
-        "Update Frequency",
-        options=["3 seconds", "5 seconds", "10 seconds", "30 seconds", "1 minute"],
-        value="5 seconds"
+def generate_real_time_data(rng):
+    """Generate fluctuating real-time data for multiple products"""
+    return generate_real_time_ticks(
+        PRODUCTS,
+        rng=rng,
+        sales_range=(1, 50),
+        views_per_sale=(5, 15),
+        price_points=[299, 399, 499, 699, 899, 1099, 1299],
+        price_jitter=0.2  # Price fluctuations
     )
-    
-    st.header("📊 Display Options")
-    show_overview = st.checkbox("Show Overview Metrics", value=True)
-    show_product_grid = st.checkbox("Show Product Grid", value=True)
-    show_detailed_view = st.checkbox("Show Detailed Product View", value=True)
 
 # Convert frequency to seconds
 frequency_map = {
@@ -125,171 +103,215 @@ frequency_map = {
     "30 seconds": 30,
     "1 minute": 60
 }
-update_interval = frequency_map[update_frequency]
+DEFAULT_FREQUENCY = "5 seconds"
+
+@st.cache_resource
+def live_feed():
+    """Background ticker and bounded live history shared by every session of this dashboard"""
+    rng = np.random.default_rng()
+    return start_feed(REAL_TIME_COLUMNS, lambda: generate_real_time_data(rng), frequency_map[DEFAULT_FREQUENCY])
+
+feed, source = live_feed()
+
+# Sidebar for controls
+with st.sidebar:
+    st.header("⚡ Dashboard Controls")
+    # Live fragments refresh at the shared feed's rate
+    update_interval = frequency_slider(feed, frequency_map)
+    
+    st.header("📊 Display Options")
+    show_overview = st.checkbox("Show Overview Metrics", value=True)
+    show_product_grid = st.checkbox("Show Product Grid", value=True)
+    show_detailed_view = st.checkbox("Show Detailed Product View", value=True)
+    show_perf = st.checkbox("Show Performance Panel", value=False)
+    chart_range = st.select_slider(
+        "Chart Time Range",
+        options=list(CHART_RANGES),
+        value="24 hours"
+    )
+
+chart_window = CHART_RANGES[chart_range]
 
 # Real-time data update
-if st.button("🔄 Refresh All Data") or (datetime.now() - st.session_state.last_update).seconds >= update_interval:
-    new_data = generate_real_time_data()
-    st.session_state.real_time_data = pd.concat([st.session_state.real_time_data, new_data], ignore_index=True)
-    st.session_state.last_update = datetime.now()
-    st.rerun()
+# (ticks come from the background feed; the live sections below are
+# fragments that re-read it on their own timer)
+if st.button("🔄 Refresh All Data"):
+    feed.tick()
 
 # Overview metrics
-if show_overview and not st.session_state.real_time_data.empty:
-    st.header("📈 Overview Metrics")
+@st.fragment(run_every=update_interval)
+@timed("fragment.live_overview")
+def live_overview():
+    if show_overview and not feed.buffer.empty:
+        st.header("📈 Overview Metrics")
     
-    df = st.session_state.real_time_data.copy()
-    df['sales'] = pd.to_numeric(df['sales'], errors='coerce')
-    df['views'] = pd.to_numeric(df['views'], errors='coerce')
-    df['price'] = pd.to_numeric(df['price'], errors='coerce')
+        df = feed.frame()
     
-    col1, col2, col3, col4 = st.columns(4)
+        col1, col2, col3, col4 = st.columns(4)
     
-    with col1:
-        total_sales = df['sales'].sum()
-        revenue = (df['sales'] * df['price']).sum()
-        st.metric("💰 Total Revenue", f"${revenue:,.0f}", delta=f"+{np.random.randint(5, 15)}%")
+        with col1:
+            total_sales = df['sales'].sum()
+            revenue = (df['sales'] * df['price']).sum()
+            st.metric("💰 Total Revenue", f"${revenue:,.0f}", delta=f"+{np.random.randint(5, 15)}%")
     
-    with col2:
-        total_views = df['views'].sum()
-        st.metric("👀 Total Views", f"{total_views:,.0f}", delta=f"+{np.random.randint(3, 10)}%")
+        with col2:
+            total_views = df['views'].sum()
+            st.metric("👀 Total Views", f"{total_views:,.0f}", delta=f"+{np.random.randint(3, 10)}%")
     
-    with col3:
-        conversion_rate = (total_sales / total_views * 100) if total_views > 0 else 0
-        st.metric("📊 Conversion Rate", f"{conversion_rate:.1f}%", delta=f"+{np.random.uniform(0.1, 1.5):.1f}%")
+        with col3:
+            conversion_rate = (total_sales / total_views * 100) if total_views > 0 else 0
+            st.metric("📊 Conversion Rate", f"{conversion_rate:.1f}%", delta=f"+{np.random.uniform(0.1, 1.5):.1f}%")
     
-    with col4:
-        unique_products = df['product'].nunique()
-        st.metric("🎯 Active Products", f"{unique_products}", delta=f"+{np.random.randint(1, 3)}")
+        with col4:
+            unique_products = df['product'].nunique()
+            st.metric("🎯 Active Products", f"{unique_products}", delta=f"+{np.random.randint(1, 3)}")
+
+live_overview()
 
 # Product grid with clickable cards
-if show_product_grid and not st.session_state.real_time_data.empty:
-    st.header("🛍️ Product Portfolio")
+@st.fragment(run_every=update_interval)
+@timed("fragment.live_product_grid")
+def live_product_grid():
+    if show_product_grid and not feed.buffer.empty:
+        st.header("🛍️ Product Portfolio")
     
-    df = st.session_state.real_time_data.copy()
-    df['sales'] = pd.to_numeric(df['sales'], errors='coerce')
-    df['price'] = pd.to_numeric(df['price'], errors='coerce')
+        df = feed.frame()
     
-    # Get latest data for each product
-    latest_data = df.sort_values('timestamp').groupby('product').tail(1)
+        # Get latest data for each product
+        latest_data = df.sort_values('timestamp').groupby('product', observed=True).tail(1)
     
-    # Create product cards in a grid
-    cols = st.columns(4)
-    for idx, (_, row) in enumerate(latest_data.iterrows()):
-        col_idx = idx % 4
-        with cols[col_idx]:
-            is_selected = st.session_state.selected_product == row['product']
-            card_class = "product-card selected" if is_selected else "product-card"
+        # Create product cards in a grid
+        cols = st.columns(4)
+        for idx, (_, row) in enumerate(latest_data.iterrows()):
+            col_idx = idx % 4
+            with cols[col_idx]:
+                is_selected = st.session_state.selected_product == row['product']
+                card_class = "product-card selected" if is_selected else "product-card"
             
-            st.markdown(f"""
-            <div class="{card_class}" onclick="window.streamlit.setComponentValue('{row['product']}')">
-                <h4>📦 {row['product']}</h4>
-                <p><strong>Sales:</strong> {int(row['sales'])} units</p>
-                <p><strong>Price:</strong> ${row['price']:,.2f}</p>
-                <p><strong>Revenue:</strong> ${row['sales'] * row['price']:,.0f}</p>
-            </div>
-            """, unsafe_allow_html=True)
+                st.markdown(f"""
+                <div class="{card_class}" onclick="window.streamlit.setComponentValue('{row['product']}')">
+                    <h4>📦 {row['product']}</h4>
+                    <p><strong>Sales:</strong> {int(row['sales'])} units</p>
+                    <p><strong>Price:</strong> ${row['price']:,.2f}</p>
+                    <p><strong>Revenue:</strong> ${row['sales'] * row['price']:,.0f}</p>
+                </div>
+                """, unsafe_allow_html=True)
             
-            # Add click handler using Streamlit's experimental feature
-            if st.button(f"Select {row['product']}", key=f"btn_{row['product']}"):
-                st.session_state.selected_product = row['product']
-                st.rerun()
+                # Add click handler using Streamlit's experimental feature
+                if st.button(f"Select {row['product']}", key=f"btn_{row['product']}"):
+                    st.session_state.selected_product = row['product']
+                    st.rerun()
+
+live_product_grid()
 
 # Detailed product view
-if show_detailed_view and st.session_state.selected_product and not st.session_state.real_time_data.empty:
-    st.header(f"🔍 Detailed Analysis: {st.session_state.selected_product}")
+@st.fragment(run_every=update_interval)
+@timed("fragment.live_product_detail")
+def live_product_detail():
+    if show_detailed_view and st.session_state.selected_product and not feed.buffer.empty:
+        st.header(f"🔍 Detailed Analysis: {st.session_state.selected_product}")
     
-    df = st.session_state.real_time_data.copy()
-    product_data = df[df['product'] == st.session_state.selected_product].copy()
-    product_data['sales'] = pd.to_numeric(product_data['sales'], errors='coerce')
-    product_data['views'] = pd.to_numeric(product_data['views'], errors='coerce')
-    product_data['price'] = pd.to_numeric(product_data['price'], errors='coerce')
-    product_data['revenue'] = product_data['sales'] * product_data['price']
+        # The history changes every tick, so a mask over its categorical product codes
+        # is cheaper than rebuilding a per-product index for one lookup
+        df = feed.frame()
+        product_data = df[df['product'] == st.session_state.selected_product].copy()
+        product_data['revenue'] = product_data['sales'] * product_data['price']
     
-    if not product_data.empty:
-        # Product metrics
-        col1, col2, col3, col4 = st.columns(4)
+        if not product_data.empty:
+            # Product metrics
+            col1, col2, col3, col4 = st.columns(4)
         
-        with col1:
-            total_sales = product_data['sales'].sum()
-            st.metric("Total Sales", f"{total_sales:,.0f} units")
+            with col1:
+                total_sales = product_data['sales'].sum()
+                st.metric("Total Sales", f"{total_sales:,.0f} units")
         
-        with col2:
-            avg_price = product_data['price'].mean()
-            st.metric("Avg Price", f"${avg_price:,.2f}")
+            with col2:
+                avg_price = product_data['price'].mean()
+                st.metric("Avg Price", f"${avg_price:,.2f}")
         
-        with col3:
-            total_revenue = product_data['revenue'].sum()
-            st.metric("Total Revenue", f"${total_revenue:,.0f}")
+            with col3:
+                total_revenue = product_data['revenue'].sum()
+                st.metric("Total Revenue", f"${total_revenue:,.0f}")
         
-        with col4:
-            conversion_rate = (product_data['sales'].sum() / product_data['views'].sum() * 100) if product_data['views'].sum() > 0 else 0
-            st.metric("Conversion Rate", f"{conversion_rate:.1f}%")
+            with col4:
+                conversion_rate = (product_data['sales'].sum() / product_data['views'].sum() * 100) if product_data['views'].sum() > 0 else 0
+                st.metric("Conversion Rate", f"{conversion_rate:.1f}%")
         
-        # Product charts
-        col1, col2 = st.columns(2)
+            # Product charts
+            col1, col2 = st.columns(2)
         
-        with col1:
-            # Sales trend
-            sales_trend = product_data.groupby('timestamp')['sales'].sum().reset_index()
-            fig_sales = px.line(
-                sales_trend, 
-                x='timestamp', 
-                y='sales', 
-                title=f'{st.session_state.selected_product} - Sales Trend',
-                markers=True
-            )
-            st.plotly_chart(fig_sales, use_container_width=True)
+            with col1:
+                # Sales trend
+                sales_trend = downsample_window(product_data.groupby('timestamp')['sales'].sum().reset_index(), 'sales', chart_window)
+                with timed("plotly.sales"):
+                    fig_sales = px.line(
+                        sales_trend, 
+                        x='timestamp', 
+                        y='sales', 
+                        title=f'{st.session_state.selected_product} - Sales Trend',
+                        markers=True
+                    )
+                    st.plotly_chart(fig_sales, use_container_width=True)
         
-        with col2:
-            # Price movement
-            price_trend = product_data.groupby('timestamp')['price'].mean().reset_index()
-            fig_price = px.line(
-                price_trend, 
-                x='timestamp', 
-                y='price', 
-                title=f'{st.session_state.selected_product} - Price Movement',
-                markers=True,
-                line_shape='spline'
-            )
-            st.plotly_chart(fig_price, use_container_width=True)
+            with col2:
+                # Price movement
+                price_trend = downsample_window(product_data.groupby('timestamp')['price'].mean().reset_index(), 'price', chart_window)
+                with timed("plotly.price"):
+                    fig_price = px.line(
+                        price_trend, 
+                        x='timestamp', 
+                        y='price', 
+                        title=f'{st.session_state.selected_product} - Price Movement',
+                        markers=True,
+                        line_shape='spline'
+                    )
+                    st.plotly_chart(fig_price, use_container_width=True)
         
-        # Additional analytics
-        st.subheader("📊 Performance Analytics")
+            # Additional analytics
+            st.subheader("📊 Performance Analytics")
         
-        col1, col2 = st.columns(2)
+            col1, col2 = st.columns(2)
         
-        with col1:
-            # Sales distribution
-            fig_dist = px.histogram(
-                product_data, 
-                x='sales', 
-                title='Sales Distribution',
-                nbins=10
-            )
-            st.plotly_chart(fig_dist, use_container_width=True)
+            with col1:
+                # Sales distribution
+                with timed("plotly.dist"):
+                    fig_dist = px.histogram(
+                        product_data, 
+                        x='sales', 
+                        title='Sales Distribution',
+                        nbins=10
+                    )
+                    st.plotly_chart(fig_dist, use_container_width=True)
         
-        with col2:
-            # Revenue by time
-            revenue_trend = product_data.groupby('timestamp')['revenue'].sum().reset_index()
-            fig_revenue = px.area(
-                revenue_trend, 
-                x='timestamp', 
-                y='revenue', 
-                title='Revenue Over Time',
-                color_discrete_sequence=['#00cc96']
-            )
-            st.plotly_chart(fig_revenue, use_container_width=True)
+            with col2:
+                # Revenue by time
+                revenue_trend = downsample_window(product_data.groupby('timestamp')['revenue'].sum().reset_index(), 'revenue', chart_window)
+                with timed("plotly.revenue"):
+                    fig_revenue = px.area(
+                        revenue_trend, 
+                        x='timestamp', 
+                        y='revenue', 
+                        title='Revenue Over Time',
+                        color_discrete_sequence=['#00cc96']
+                    )
+                    st.plotly_chart(fig_revenue, use_container_width=True)
         
-        # Raw data for selected product
-        st.subheader("📋 Product Data Stream")
-        st.dataframe(
-            product_data.sort_values('timestamp', ascending=False).head(20),
-            use_container_width=True,
-            height=300
-        )
+            # Raw data for selected product
+            st.subheader("📋 Product Data Stream")
+            with timed("st.dataframe"):
+                st.dataframe(
+                    product_data.sort_values('timestamp', ascending=False).head(20),
+                    use_container_width=True,
+                    height=300
+                )
+
+live_product_detail()
 
 # Footer
 st.markdown("---")
-st.caption(f"🔄 Last update: {st.session_state.last_update.strftime('%Y-%m-%d %H:%M:%S')}")
+
+live_status(feed, source, update_interval)
+
 st.caption("📊 Click on any product card to view detailed analytics")
+
+finish_run(rerun_timer, update_interval, show_perf)
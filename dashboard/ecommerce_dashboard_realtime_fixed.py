@@ -1,11 +1,15 @@
 import streamlit as st
 import plotly.express as px
-import pandas as pd
 import numpy as np
-from datetime import datetime
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.src.schema import schema_for
+from src.src.downsampling import CHART_RANGES, downsample_window
+from src.src.simulator import generate_real_time_ticks
+from src.src.live import start_run, finish_run, start_feed, frequency_slider, live_status
+from src.src.rollup_cube import RollupCube
+from src.src.instrumentation import timed
 
 # Real-time UI Configuration
 st.set_page_config(
@@ -14,6 +18,8 @@ st.set_page_config(
     page_icon="📊"
 )
 
+rerun_timer = start_run()
+
 # Custom CSS for real-time feel
 st.markdown("""
 <style>
@@ -49,164 +55,208 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Initialize session state for real-time data
-if 'real_time_data' not in st.session_state:
-    st.session_state.real_time_data = pd.DataFrame(columns=['timestamp', 'product', 'sales', 'views'])
-if 'last_update' not in st.session_state:
-    st.session_state.last_update = datetime.now()
+REAL_TIME_COLUMNS = schema_for('timestamp', 'product', 'sales', 'views')
 
 # Function to generate real-time data fluctuations
-def generate_real_time_data():
+def generate_real_time_data(rng):
     """Generate fluctuating real-time data"""
-    current_time = datetime.now()
     products = ['Product A', 'Product B', 'Product C', 'Product D', 'Product E']
-    
-    new_data = []
-    for product in products:
-        # Generate random sales and views with realistic fluctuations
-        sales = np.random.randint(50, 500)
-        views = int(sales * np.random.uniform(3, 8))
-        
-        new_data.append({
-            'timestamp': current_time,
-            'product': product,
-            'sales': sales,
-            'views': views
-        })
-    
-    return pd.DataFrame(new_data)
+    return generate_real_time_ticks(products, rng=rng, sales_range=(50, 500), views_per_sale=(3, 8))
+
+# Convert frequency to seconds
+frequency_map = {
+    "1 second": 1,
+    "5 seconds": 5,
+    "10 seconds": 10,
+    "30 seconds": 30,
+    "1 minute": 60
+}
+DEFAULT_FREQUENCY = "5 seconds"
+
+@st.cache_resource
+def live_feed():
+    """Background ticker, bounded live history and product rollup shared by every session of this dashboard"""
+    rng = np.random.default_rng()
+    # Per product sums by minute and by hour for the performance panel and the sales chart,
+    # kept in step with the history
+    cube = RollupCube(('product',), {'sales': 'sales', 'views': 'views'}, bucket=('1min', '1h'), dtypes=REAL_TIME_COLUMNS)
+    # LIVE_SOURCE=tail:<csv/jsonl file>, tcp:<host>:<port> or unix:<path> feeds real
+    # order events instead of the simulator
+    feed, source = start_feed(
+        REAL_TIME_COLUMNS,
+        lambda: generate_real_time_data(rng),
+        frequency_map[DEFAULT_FREQUENCY],
+        on_tick=lambda batch, history: cube.update(batch).retain(len(history)),
+        source_spec=os.environ.get('LIVE_SOURCE')
+    )
+    return feed, source, cube
+
+feed, source, cube = live_feed()
 
 # Sidebar for real-time controls
 with st.sidebar:
     st.header("⚡ Real-Time Controls")
-    update_frequency = st.select_slider(
-        "Update Frequency",
-        options=["1 second", "5 seconds", "10 seconds", "30 seconds", "1 minute"],
-        value="5 seconds"
-    )
+    # Live fragments refresh at the shared feed's rate
+    update_interval = frequency_slider(feed, frequency_map)
     
     st.header("📊 Display Options")
     show_live_charts = st.checkbox("Show Live Charts", value=True)
     show_metrics = st.checkbox("Show Real-time Metrics", value=True)
+    show_perf = st.checkbox("Show Performance Panel", value=False)
+    chart_range = st.select_slider(
+        "Chart Time Range",
+        options=list(CHART_RANGES),
+        value="24 hours"
+    )
+    chart_resolution = st.select_slider(
+        "Chart Resolution",
+        options=["Per tick", "1 minute", "1 hour"],
+        value="Per tick"
+    )
 
-# Convert frequency to seconds
-frequency_map = {
-    "1 second": 1,
-    "5 seconds": 5,
-    "10 seconds": 10,
-    "30 seconds": 30,
-    "1 minute": 60
+chart_window = CHART_RANGES[chart_range]
+
+# Minute and hour views come straight from the rollup's buckets
+chart_resolution_map = {
+    "Per tick": None,
+    "1 minute": "1min",
+    "1 hour": "1h"
 }
-update_interval = frequency_map[update_frequency]
+
+def sales_over_time(frame):
+    """Total sales per tick, or per bucket of the selected chart resolution, over the chart range"""
+    resolution = chart_resolution_map[chart_resolution]
+    if resolution is None:
+        return downsample_window(frame.groupby('timestamp')['sales'].sum().reset_index(), 'sales', chart_window)
+    with feed.lock:
+        series = cube.query('bucket', resolution=resolution, start=frame['timestamp'].iloc[-1] - chart_window)
+    # 1-minute buckets over 24 hours are still more points than the chart budget
+    return downsample_window(series.rename(columns={'bucket': 'timestamp'})[['timestamp', 'sales']], 'sales', chart_window)
 
 # Real-time data update logic
-if st.button("🔄 Refresh Data") or (datetime.now() - st.session_state.last_update).seconds >= update_interval:
-    new_data = generate_real_time_data()
-    st.session_state.real_time_data = pd.concat([st.session_state.real_time_data, new_data], ignore_index=True)
-    st.session_state.last_update = datetime.now()
-    st.rerun()
+# (ticks come from the background feed; the live sections below are
+# fragments that re-read it on their own timer)
+if st.button("🔄 Refresh Data"):
+    feed.tick()
 
 # Display real-time metrics
-if show_metrics and not st.session_state.real_time_data.empty:
-    st.header("📈 Real-time Metrics")
+@st.fragment(run_every=update_interval)
+@timed("fragment.live_metrics")
+def live_metrics():
+    if show_metrics and not feed.buffer.empty:
+        st.header("📈 Real-time Metrics")
     
-    # Ensure numeric data types
-    df = st.session_state.real_time_data.copy()
-    df['sales'] = pd.to_numeric(df['sales'], errors='coerce')
-    df['views'] = pd.to_numeric(df['views'], errors='coerce')
+        df = feed.frame()
     
-    col1, col2, col3, col4 = st.columns(4)
+        col1, col2, col3, col4 = st.columns(4)
     
-    with col1:
-        total_sales = df['sales'].sum()
-        st.metric("💰 Total Sales", f"${total_sales:,.0f}", delta=f"+{np.random.randint(5, 15)}%")
+        with col1:
+            total_sales = df['sales'].sum()
+            st.metric("💰 Total Sales", f"${total_sales:,.0f}", delta=f"+{np.random.randint(5, 15)}%")
     
-    with col2:
-        total_views = df['views'].sum()
-        st.metric("👀 Total Views", f"{total_views:,.0f}", delta=f"+{np.random.randint(3, 10)}%")
+        with col2:
+            total_views = df['views'].sum()
+            st.metric("👀 Total Views", f"{total_views:,.0f}", delta=f"+{np.random.randint(3, 10)}%")
     
-    with col3:
-        conversion_rate = (total_sales / total_views * 100) if total_views > 0 else 0
-        st.metric("📊 Conversion Rate", f"{conversion_rate:.1f}%", delta=f"+{np.random.uniform(0.1, 1.5):.1f}%")
+        with col3:
+            conversion_rate = (total_sales / total_views * 100) if total_views > 0 else 0
+            st.metric("📊 Conversion Rate", f"{conversion_rate:.1f}%", delta=f"+{np.random.uniform(0.1, 1.5):.1f}%")
     
-    with col4:
-        unique_products = df['product'].nunique()
-        st.metric("🎯 Active Products", f"{unique_products}", delta=f"+{np.random.randint(1, 3)}")
+        with col4:
+            unique_products = df['product'].nunique()
+            st.metric("🎯 Active Products", f"{unique_products}", delta=f"+{np.random.randint(1, 3)}")
+
+live_metrics()
 
 # Live charts section
-if show_live_charts and not st.session_state.real_time_data.empty:
-    st.header("📊 Live Charts")
+@st.fragment(run_every=update_interval)
+@timed("fragment.live_charts")
+def live_charts():
+    if show_live_charts and not feed.buffer.empty:
+        st.header("📊 Live Charts")
     
-    df = st.session_state.real_time_data.copy()
-    df['sales'] = pd.to_numeric(df['sales'], errors='coerce')
+        df = feed.frame()
     
-    # Real-time sales by product (last 20 entries)
-    recent_data = df.tail(20)
-    fig_sales = px.bar(
-        recent_data, 
-        x='product', 
-        y='sales', 
-        title='Real-time Sales by Product',
-        color='sales',
-        text='sales'
-    )
-    fig_sales.update_layout(xaxis_tickangle=45)
-    st.plotly_chart(fig_sales, use_container_width=True)
+        # Real-time sales by product (last 20 entries)
+        recent_data = df.tail(20)
+        with timed("plotly.sales"):
+            fig_sales = px.bar(
+                recent_data, 
+                x='product', 
+                y='sales', 
+                title='Real-time Sales by Product',
+                color='sales',
+                text='sales'
+            )
+            fig_sales.update_layout(xaxis_tickangle=45)
+            st.plotly_chart(fig_sales, use_container_width=True)
     
-    # Time series of sales
-    time_series_data = df.groupby('timestamp')['sales'].sum().reset_index()
-    fig_time = px.line(
-        time_series_data, 
-        x='timestamp', 
-        y='sales', 
-        title='Sales Over Time (Real-time)',
-        markers=True
-    )
-    st.plotly_chart(fig_time, use_container_width=True)
+        # Time series of sales
+        time_series_data = sales_over_time(df)
+        with timed("plotly.time"):
+            fig_time = px.line(
+                time_series_data, 
+                x='timestamp', 
+                y='sales', 
+                title='Sales Over Time (Real-time)',
+                markers=True
+            )
+            st.plotly_chart(fig_time, use_container_width=True)
+
+live_charts()
 
 # Real-time product performance
-st.header("🚀 Real-time Product Performance")
+@st.fragment(run_every=update_interval)
+@timed("fragment.live_performance")
+def live_performance():
+    st.header("🚀 Real-time Product Performance")
 
-if not st.session_state.real_time_data.empty:
-    df = st.session_state.real_time_data.copy()
-    df['sales'] = pd.to_numeric(df['sales'], errors='coerce')
-    df['views'] = pd.to_numeric(df['views'], errors='coerce')
-    
-    # Top performing products
-    product_performance = df.groupby('product').agg({
-        'sales': 'sum',
-        'views': 'sum'
-    }).reset_index()
+    if not feed.buffer.empty:
+        # Top performing products, from the maintained rollup rather than a scan of the history
+        with feed.lock:
+            product_performance = cube.query('product')
     
-    product_performance['conversion_rate'] = (product_performance['sales'] / product_performance['views'] * 100).fillna(0).round(2)
+        product_performance['conversion_rate'] = (product_performance['sales'] / product_performance['views'] * 100).fillna(0).round(2)
     
-    col1, col2 = st.columns(2)
+        col1, col2 = st.columns(2)
     
-    with col1:
-        st.subheader("🏆 Top Selling Products")
-        top_products = product_performance.nlargest(5, 'sales')
-        for _, row in top_products.iterrows():
-            max_sales = top_products['sales'].max()
-            progress = row['sales'] / max_sales if max_sales > 0 else 0
-            st.progress(progress, text=f"{row['product']}: ${row['sales']:,.0f}")
+        with col1:
+            st.subheader("🏆 Top Selling Products")
+            top_products = product_performance.nlargest(5, 'sales')
+            for _, row in top_products.iterrows():
+                max_sales = top_products['sales'].max()
+                progress = row['sales'] / max_sales if max_sales > 0 else 0
+                st.progress(progress, text=f"{row['product']}: ${row['sales']:,.0f}")
     
-    with col2:
-        st.subheader("⭐ Best Converters")
-        best_converters = product_performance.nlargest(5, 'conversion_rate')
-        for _, row in best_converters.iterrows():
-            progress = min(row['conversion_rate'] / 100, 1.0)
-            st.progress(progress, text=f"{row['product']}: {row['conversion_rate']:.1f}%")
+        with col2:
+            st.subheader("⭐ Best Converters")
+            best_converters = product_performance.nlargest(5, 'conversion_rate')
+            for _, row in best_converters.iterrows():
+                progress = min(row['conversion_rate'] / 100, 1.0)
+                st.progress(progress, text=f"{row['product']}: {row['conversion_rate']:.1f}%")
+
+live_performance()
 
 # Real-time data table
-st.header("📋 Real-time Data Stream")
-if not st.session_state.real_time_data.empty:
-    st.dataframe(
-        st.session_state.real_time_data.tail(20).sort_values('timestamp', ascending=False),
-        use_container_width=True,
-        height=300
-    )
+@st.fragment(run_every=update_interval)
+@timed("fragment.live_stream")
+def live_stream():
+    st.header("📋 Real-time Data Stream")
+    if not feed.buffer.empty:
+        with timed("st.dataframe"):
+            st.dataframe(
+                feed.frame().tail(20).sort_values('timestamp', ascending=False),
+                use_container_width=True,
+                height=300
+            )
+
+live_stream()
 
 # Footer with last update time
 st.markdown("---")
-st.caption(f"🔄 Last update: {st.session_state.last_update.strftime('%Y-%m-%d %H:%M:%S')}")
+
+live_status(feed, source, update_interval)
+
 st.caption("📊 Data updates automatically based on selected frequency")
+
+finish_run(rerun_timer, update_interval, show_perf)
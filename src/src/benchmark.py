@@ -0,0 +1,194 @@
+"""Headless benchmark harness for the dashboard analytics pipeline.
+
+Generates synthetic sales datasets at several scales, times each pipeline
+stage on them and writes a JSON report, e.g.:
+
+	python -m src.src.benchmark --products 100 1000 --weeks 52 --rows-per-week 5 -o bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .ecommerce_trends import load_data, compute_weekly, find_trending
+from .forecasting import predict_sales_trends
+from .parallel_weekly import compute_weekly_parallel
+from .trend_detectors import TrendDetectors, detect_changes
+from .trend_engine import TrendEngine, detect_trends
+
+# history lengths, in ticks of the whole catalog, at which the streaming engines are timed
+DEFAULT_TICK_HISTORY = [10, 1000]
+
+
+def make_sales_dataset(n_products, n_categories=4, n_weeks=52, rows_per_week=5, seed=0,
+		start="2025-01-01"):
+	"""Synthetic order-level sales in the CSV schema (product,date,sales,views,price,category).
+
+	Every product gets `rows_per_week` rows in each of `n_weeks` weeks, with a
+	per-product base volume, price and linear drift so trends are non-trivial.
+	"""
+	rng = np.random.default_rng(seed)
+	rows_per_product = n_weeks * rows_per_week
+	product = np.repeat(np.arange(n_products), rows_per_product)
+	week = np.tile(np.repeat(np.arange(n_weeks), rows_per_week), n_products)
+	day = week * 7 + rng.integers(0, 7, len(product))
+
+	base = rng.uniform(2, 40, n_products)
+	drift = rng.normal(0, 0.01, n_products)
+	level = base[product] * np.clip(1 + drift[product] * week, 0.1, None)
+	sales = rng.poisson(level)
+	views = (sales * rng.uniform(5, 20, len(product))).astype(np.int64) + rng.integers(0, 10, len(product))
+	price = np.round(rng.choice([19.99, 49.99, 99.99, 299.99, 999.99], n_products)[product]
+		* rng.uniform(0.95, 1.05, len(product)), 2)
+
+	names = np.array([f"Product {i:06d}" for i in range(n_products)], dtype=object)
+	categories = np.array([f"Category {i:03d}" for i in range(n_categories)], dtype=object)
+	return pd.DataFrame({
+		"product": names[product],
+		"date": pd.Timestamp(start) + pd.to_timedelta(day, unit="D"),
+		"sales": sales,
+		"views": views,
+		"price": price,
+		"category": categories[np.arange(n_products) % n_categories][product],
+	})
+
+
+def time_stage(fn, repeat=3):
+	"""Run fn() `repeat` times; return (last result, timing summary in seconds)"""
+	samples = []
+	result = None
+	for _ in range(repeat):
+		start = time.perf_counter()
+		result = fn()
+		samples.append(time.perf_counter() - start)
+	return result, summarize(samples)
+
+
+def summarize(samples):
+	return {"best": min(samples), "median": statistics.median(samples), "samples": samples}
+
+
+def time_ticks(n_products, history=DEFAULT_TICK_HISTORY, ticks=20, seed=0, interval="10s"):
+	"""Per-tick cost of the streaming trend engines after `history` ticks of the whole catalog.
+
+	For each history length the engines are first fed up to it, then timed
+	over `ticks` more ticks; flat timings across lengths show that a tick
+	does not get slower as the history grows.
+	"""
+	rng = np.random.default_rng(seed)
+	names = np.array([f"Product {i:06d}" for i in range(n_products)], dtype=object)
+	base = rng.uniform(2, 40, n_products)
+	start, step = np.datetime64("2025-01-01", "ns"), pd.Timedelta(interval).to_timedelta64()
+	trend_engine, detectors = TrendEngine(), TrendDetectors()
+	stages, seen = {}, 0
+	for length in sorted(history):
+		samples = {"trend_engine": [], "trend_detectors": []}
+		while seen < length + ticks:
+			values = rng.poisson(base)
+			stamps = np.full(n_products, start + seen * step)
+			for name, observe in (
+					("trend_engine", lambda: trend_engine.observe(names, values)),
+					("trend_detectors", lambda: detectors.observe(names, values, stamps))):
+				began = time.perf_counter()
+				observe()
+				if seen >= length:
+					samples[name].append(time.perf_counter() - began)
+			seen += 1
+		for name, times in samples.items():
+			stages[f"{name}.tick[{length}]"] = summarize(times)
+	return stages
+
+
+def run_scale(n_products, n_categories, n_weeks, rows_per_week, repeat=3, seed=0,
+		prediction_days=30, confidence=0.9, workers=(), tick_history=()):
+	raw = make_sales_dataset(n_products, n_categories, n_weeks, rows_per_week, seed)
+	stages = {}
+	with tempfile.TemporaryDirectory() as tmp:
+		path = os.path.join(tmp, "sales.csv")
+		raw.to_csv(path, index=False)
+		csv_bytes = os.path.getsize(path)
+		df, stages["load_data"] = time_stage(lambda: load_data(path), repeat)
+	weekly, stages["compute_weekly"] = time_stage(lambda: compute_weekly(df), repeat)
+	for n in workers:
+		stages[f"compute_weekly_parallel[{n}]"] = time_stage(
+			lambda: compute_weekly_parallel(df, workers=n, min_rows=0), repeat)[1]
+	_, stages["find_trending"] = time_stage(lambda: find_trending(weekly), repeat)
+	_, stages["predict_sales_trends"] = time_stage(
+		lambda: predict_sales_trends(weekly, prediction_days, confidence), repeat)
+	history = df.rename(columns={"date": "timestamp"})
+	_, stages["detect_trends"] = time_stage(lambda: detect_trends(history), repeat)
+	_, stages["detect_changes"] = time_stage(
+		lambda: detect_changes(history, season_period=7, season_bucket="1D"), repeat)
+	if tick_history:
+		stages.update(time_ticks(n_products, tick_history, seed=seed))
+	return {
+		"products": n_products,
+		"categories": n_categories,
+		"weeks": n_weeks,
+		"rows_per_week": rows_per_week,
+		"rows": len(raw),
+		"csv_bytes": csv_bytes,
+		"weekly_rows": len(weekly),
+		"stages": stages,
+	}
+
+
+def run(products, categories=4, weeks=52, rows_per_week=5, repeat=3, seed=0, workers=(),
+		tick_history=DEFAULT_TICK_HISTORY, log=None):
+	report = {
+		"created": datetime.now().isoformat(timespec="seconds"),
+		"environment": {
+			"python": platform.python_version(),
+			"platform": platform.platform(),
+			"pandas": pd.__version__,
+			"numpy": np.__version__,
+			"cpus": os.cpu_count(),
+		},
+		"results": [],
+	}
+	for n_products in products:
+		result = run_scale(n_products, categories, weeks, rows_per_week, repeat, seed, workers=workers,
+			tick_history=tick_history)
+		report["results"].append(result)
+		if log is not None:
+			timings = ", ".join(f"{name}={s['best']:.3f}s" for name, s in result["stages"].items())
+			print(f"{result['rows']:>10} rows ({n_products} products): {timings}", file=log)
+	return report
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--products", type=int, nargs="+", default=[100, 1000, 10000],
+		help="catalog sizes to benchmark, one run per value")
+	parser.add_argument("--categories", type=int, default=4)
+	parser.add_argument("--weeks", type=int, default=52)
+	parser.add_argument("--rows-per-week", type=int, default=5, help="rows per product per week")
+	parser.add_argument("--repeat", type=int, default=3)
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--workers", type=int, nargs="*", default=[],
+		help="also time compute_weekly_parallel with each of these process counts")
+	parser.add_argument("--tick-history", type=int, nargs="*", default=DEFAULT_TICK_HISTORY,
+		help="history lengths (in ticks) at which to time one TrendEngine / TrendDetectors tick; none to skip")
+	parser.add_argument("-o", "--output", help="write the JSON report here instead of stdout")
+	args = parser.parse_args(argv)
+
+	report = run(args.products, args.categories, args.weeks, args.rows_per_week,
+		args.repeat, args.seed, args.workers, args.tick_history, log=sys.stderr)
+	if args.output:
+		with open(args.output, "w") as f:
+			json.dump(report, f, indent=2)
+	else:
+		json.dump(report, sys.stdout, indent=2)
+		print()
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,110 @@
+import os
+
+import pandas as pd
+
+from .ecommerce_trends import load_data
+from .instrumentation import timed
+from .schema import apply_schema
+
+try:
+	import pyarrow as pa
+	import pyarrow.feather as feather
+except ImportError:  # pyarrow ships with streamlit, but keep src usable without it
+	pa = None
+	feather = None
+
+STORE_VERSION = "4"
+STORE_DIRNAME = ".columnar"
+
+
+def to_columnar_frame(df):
+	"""Copy of a sales frame cast to SALES_SCHEMA"""
+	return apply_schema(df.copy())
+
+
+def store_path(csv_path, store_dir=None):
+	csv_path = os.path.abspath(os.fspath(csv_path))
+	store_dir = store_dir or os.path.join(os.path.dirname(csv_path), STORE_DIRNAME)
+	name = os.path.splitext(os.path.basename(csv_path))[0]
+	return os.path.join(store_dir, name + ".feather")
+
+
+def _source_metadata(csv_path):
+	st = os.stat(csv_path)
+	return {
+		b"store_version": STORE_VERSION.encode(),
+		b"source_mtime_ns": str(st.st_mtime_ns).encode(),
+		b"source_size": str(st.st_size).encode(),
+	}
+
+
+def is_fresh(csv_path, path):
+	"""True if the columnar file at `path` was built from the current CSV contents"""
+	if feather is None or not os.path.exists(path):
+		return False
+	with pa.memory_map(path) as source:
+		metadata = pa.ipc.open_file(source).schema.metadata or {}
+	expected = _source_metadata(csv_path)
+	return all(metadata.get(k) == v for k, v in expected.items())
+
+
+def ingest_csv(csv_path, out_path=None):
+	"""Parse a sales CSV once and persist it as an uncompressed (mmap-able) Feather file.
+
+	The table is written as a single record batch, so load_columnar() can
+	map every column without stitching chunks together.
+	"""
+	if feather is None:
+		raise ImportError("pyarrow is required to build the columnar store")
+	out_path = out_path or store_path(csv_path)
+	os.makedirs(os.path.dirname(out_path), exist_ok=True)
+	metadata = _source_metadata(csv_path)
+	table = pa.Table.from_pandas(load_data(csv_path), preserve_index=False)
+	table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+	# write-then-rename so concurrent readers never map a half-written file
+	tmp_path = out_path + ".tmp-%d" % os.getpid()
+	feather.write_feather(table, tmp_path, compression="uncompressed", chunksize=max(len(table), 1))
+	os.replace(tmp_path, out_path)
+	return out_path
+
+
+def _column_view(column):
+	"""Zero-copy pandas column of a single-chunk, null-free Arrow column; a converted copy otherwise"""
+	if column.num_chunks == 1 and column.null_count == 0:
+		chunk = column.chunk(0)
+		try:
+			if pa.types.is_dictionary(chunk.type):
+				# the codes stay in the mapped file, only the labels are materialized
+				return pd.Categorical.from_codes(chunk.indices.to_numpy(zero_copy_only=True),
+					categories=pd.Index(chunk.dictionary.to_pandas()))
+			return chunk.to_numpy(zero_copy_only=True)
+		except pa.ArrowInvalid:
+			pass
+	return column.to_pandas()
+
+
+@timed("load_columnar")
+def load_columnar(path):
+	"""Sales frame whose columns are read-only views of the memory-mapped Feather file.
+
+	Numbers and dates are numpy views of the mapping and categoricals keep
+	their dictionary codes there, so a load costs page faults rather than
+	a copy of the data, and sessions sharing the frame share the pages.
+	"""
+	table = feather.read_table(path, memory_map=True)
+	return pd.DataFrame({name: _column_view(column) for name, column in zip(table.column_names, table.columns)},
+		copy=False)
+
+
+def load_data_columnar(file_or_path, store_dir=None):
+	"""load_data() backed by the columnar store; uploads are parsed in memory only"""
+	if feather is None or not isinstance(file_or_path, (str, os.PathLike)):
+		return load_data(file_or_path)
+	path = store_path(file_or_path, store_dir)
+	if not is_fresh(file_or_path, path):
+		try:
+			ingest_csv(file_or_path, path)
+		except OSError:
+			# read-only data directory: fall back to a plain parse
+			return load_data(file_or_path)
+	return load_columnar(path)
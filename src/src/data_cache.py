@@ -0,0 +1,146 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from .columnar_store import load_data_columnar
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def frame_nbytes(df):
+	"""Approximate in-memory size of a DataFrame, including object payloads"""
+	return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class LRUCache:
+	"""Thread-safe LRU mapping bounded by the total size of its values"""
+
+	def __init__(self, max_bytes=DEFAULT_MAX_BYTES, sizeof=frame_nbytes):
+		self.max_bytes = max_bytes
+		self.sizeof = sizeof
+		self.hits = 0
+		self.misses = 0
+		self._entries = OrderedDict()
+		self._nbytes = 0
+		self._lock = threading.RLock()
+
+	def __len__(self):
+		return len(self._entries)
+
+	def __contains__(self, key):
+		return key in self._entries
+
+	@property
+	def nbytes(self):
+		return self._nbytes
+
+	def get(self, key, default=None, count=True):
+		"""Look up `key`, marking it most recently used; count=False skips the hit/miss stats"""
+		with self._lock:
+			if key not in self._entries:
+				self.misses += count
+				return default
+			self._entries.move_to_end(key)
+			self.hits += count
+			return self._entries[key][0]
+
+	def put(self, key, value):
+		size = self.sizeof(value)
+		with self._lock:
+			self.pop(key)
+			if size > self.max_bytes:
+				# never evict everything else for a value that cannot fit anyway
+				return value
+			self._entries[key] = (value, size)
+			self._nbytes += size
+			while self._nbytes > self.max_bytes:
+				_, (_, evicted) = self._entries.popitem(last=False)
+				self._nbytes -= evicted
+		return value
+
+	def pop(self, key):
+		with self._lock:
+			entry = self._entries.pop(key, None)
+			if entry is None:
+				return None
+			self._nbytes -= entry[1]
+			return entry[0]
+
+	def discard_where(self, predicate):
+		with self._lock:
+			for key in [k for k in self._entries if predicate(k)]:
+				self.pop(key)
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
+			self._nbytes = 0
+
+	def stats(self):
+		return {
+			"entries": len(self._entries),
+			"nbytes": self._nbytes,
+			"max_bytes": self.max_bytes,
+			"hits": self.hits,
+			"misses": self.misses,
+		}
+
+
+def _read_bytes(file_obj):
+	if hasattr(file_obj, "getvalue"):
+		return file_obj.getvalue()
+	pos = file_obj.tell() if file_obj.seekable() else None
+	data = file_obj.read()
+	if pos is not None:
+		file_obj.seek(pos)
+	return data
+
+
+def fingerprint(file_or_path):
+	"""Cache key for a CSV source: path + mtime/size, or a content hash for uploads"""
+	if isinstance(file_or_path, (str, os.PathLike)):
+		path = os.path.abspath(os.fspath(file_or_path))
+		st = os.stat(path)
+		return ("path", path, st.st_mtime_ns, st.st_size)
+	data = _read_bytes(file_or_path)
+	if isinstance(data, str):
+		data = data.encode()
+	return ("content", hashlib.blake2b(data, digest_size=16).hexdigest(), len(data))
+
+
+_frames = LRUCache()
+
+
+def load_data_cached(file_or_path, cache=None):
+	"""Typed load_data() memoized on the source fingerprint; treat the result as read-only"""
+	cache = _frames if cache is None else cache
+	key = fingerprint(file_or_path)
+	df = cache.get(key)
+	if df is not None:
+		return df
+	if key[0] == "path":
+		# a new mtime/size means the file changed, so older versions are dead weight
+		cache.discard_where(lambda k: k[0] == "path" and k[1] == key[1])
+		df = load_data_columnar(key[1])
+	else:
+		data = _read_bytes(file_or_path)
+		df = load_data_columnar(io.BytesIO(data.encode() if isinstance(data, str) else data))
+	return cache.put(key, df)
+
+
+def invalidate(file_or_path=None, cache=None):
+	"""Drop cached frames for one source, or every cached frame when called bare"""
+	cache = _frames if cache is None else cache
+	if file_or_path is None:
+		cache.clear()
+	elif isinstance(file_or_path, (str, os.PathLike)):
+		path = os.path.abspath(os.fspath(file_or_path))
+		cache.discard_where(lambda k: k[0] == "path" and k[1] == path)
+	else:
+		cache.pop(fingerprint(file_or_path))
+
+
+def cache_stats(cache=None):
+	return (_frames if cache is None else cache).stats()
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+# points per chart trace; enough for a full-width line without visible loss
+DEFAULT_MAX_POINTS = 1_000
+
+# candidate bucket widths for min/max downsampling, smallest first
+TIME_RESOLUTIONS = [pd.Timedelta(step) for step in (
+	"1s", "2s", "5s", "10s", "15s", "30s",
+	"1min", "2min", "5min", "10min", "15min", "30min",
+	"1h", "2h", "3h", "6h", "12h", "1D", "7D",
+)]
+
+# "Chart Time Range" choices of the live dashboards
+CHART_RANGES = {
+	"15 minutes": pd.Timedelta(minutes=15),
+	"1 hour": pd.Timedelta(hours=1),
+	"6 hours": pd.Timedelta(hours=6),
+	"24 hours": pd.Timedelta(hours=24),
+}
+
+
+def time_resolution(span, max_buckets):
+	"""Smallest round bucket width that splits `span` into at most `max_buckets` buckets"""
+	span = pd.Timedelta(span)
+	for step in TIME_RESOLUTIONS:
+		if span / step <= max_buckets:
+			return step
+	return pd.Timedelta(np.ceil(span / max_buckets))
+
+
+def _as_float(values):
+	values = np.asarray(values)
+	if np.issubdtype(values.dtype, np.datetime64):
+		values = values.astype("datetime64[ns]").view(np.int64)
+		values = values - values[0]
+	return values.astype(np.float64)
+
+
+def lttb_indices(x, y, n_out):
+	"""Positions kept by Largest-Triangle-Three-Buckets downsampling of a series sorted by x"""
+	n = len(x)
+	if n <= n_out:
+		return np.arange(n)
+	if n_out < 3:
+		return np.array([0, n - 1][:max(n_out, 0)])
+	x = _as_float(x)
+	y = np.asarray(y, dtype=np.float64)
+	# n_out - 2 buckets between the first and the last point, which are always kept
+	edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+	kept = np.empty(n_out, dtype=np.int64)
+	kept[0], kept[-1] = 0, n - 1
+	a = 0
+	for i in range(n_out - 2):
+		lo, hi = edges[i], edges[i + 1]
+		next_lo, next_hi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+		avg_x = x[next_lo:next_hi].mean()
+		avg_y = y[next_lo:next_hi].mean()
+		# twice the area of the triangle (previous kept point, candidate, next bucket average)
+		area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+		a = lo + int(np.argmax(area))
+		kept[i + 1] = a
+	return kept
+
+
+def minmax_indices(x, y, n_out):
+	"""Positions of the first, last, minimum and maximum point of each time bucket.
+
+	The bucket width is the round time resolution that fits n_out / 2
+	buckets into the span of x, so spikes survive at any history length.
+	"""
+	n = len(x)
+	if n <= n_out:
+		return np.arange(n)
+	x = np.asarray(x)
+	y = pd.Series(np.asarray(y, dtype=np.float64))
+	if np.issubdtype(x.dtype, np.datetime64):
+		step = time_resolution(pd.Timedelta(x[-1] - x[0]), max(n_out // 2, 1))
+		buckets = (x - x[0]) // step.to_timedelta64()
+	else:
+		width = (x[-1] - x[0]) / max(n_out // 2, 1) or 1
+		buckets = ((x - x[0]) // width).astype(np.int64)
+	groups = y.groupby(buckets, sort=False)
+	kept = np.concatenate([groups.idxmin().to_numpy(), groups.idxmax().to_numpy(), [0, n - 1]])
+	return np.unique(kept)
+
+
+def downsample(frame, x, y, max_points=DEFAULT_MAX_POINTS, x_range=None, method="lttb"):
+	"""Rows of a frame sorted by `x` to plot `y` with at most ~max_points points.
+
+	`x_range` = (start, end) limits the rows to the visible window first
+	(either bound may be None), so the point budget, and with "minmax" the
+	time resolution, follow the zoom level rather than the history length.
+	"""
+	if x_range is not None:
+		start, end = x_range
+		values = frame[x]
+		mask = np.ones(len(frame), dtype=bool)
+		if start is not None:
+			mask &= (values >= start).to_numpy()
+		if end is not None:
+			mask &= (values <= end).to_numpy()
+		frame = frame[mask]
+	if len(frame) <= max_points:
+		return frame
+	if method == "lttb":
+		positions = lttb_indices(frame[x].to_numpy(), frame[y].to_numpy(), max_points)
+	elif method == "minmax":
+		positions = minmax_indices(frame[x].to_numpy(), frame[y].to_numpy(), max_points)
+	else:
+		raise ValueError(f"unknown downsampling method {method!r}")
+	return frame.iloc[positions]
+
+
+def downsample_window(frame, y, window, x="timestamp", max_points=DEFAULT_MAX_POINTS, method="lttb"):
+	"""downsample() of the rows of a frame sorted by `x` that lie within `window` of its last row"""
+	if frame.empty:
+		return frame
+	return downsample(frame, x, y, max_points, x_range=(frame[x].iloc[-1] - window, None), method=method)
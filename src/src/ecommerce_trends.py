@@ -1,27 +1,158 @@
+import numpy as np
 import pandas as pd
 
-def load_data(file_or_path):
-	df = pd.read_csv(file_or_path)
+from .instrumentation import timed
+from .schema import apply_schema, week_ordinal
+
+DEFAULT_CHUNKSIZE = 500_000
+# price centroids kept per product-week by compute_weekly_chunked
+DEFAULT_PRICE_CENTROIDS = 32
+# chunk partials merged at once by compute_weekly_chunked
+MERGE_FANIN = 8
+
+def add_week(df):
 	df["date"] = pd.to_datetime(df["date"])
-	df["week"] = df["date"].dt.to_period("W").astype(str)
+	df["week"] = week_ordinal(df["date"])
 	return df
 
+@timed("load_data")
+def load_data(file_or_path):
+	"""Read a sales CSV into the typed SALES_SCHEMA frame, with an integer week ordinal"""
+	return apply_schema(add_week(pd.read_csv(file_or_path)))
+
+@timed("compute_weekly")
 def compute_weekly(df):
-	weekly = (df.groupby(["product","week"], as_index=False)
+	# groupby sorts by (product, week), which is the only ordering needed below
+	weekly = (df.groupby(["product","week"], as_index=False, observed=True)
 		.agg(sales=("sales","sum"),
 			 views=("views","sum"),
 			 price=("price","median"),
 			 category=("category","first")))
-	weekly = weekly.sort_values(["product","week"])
-	weekly["view_to_purchase"] = weekly.apply(
-		lambda r: (r["views"]/r["sales"]) if r["sales"] > 0 else None, axis=1
-	)
-	weekly["sales_pct_change"] = weekly.groupby("product")["sales"].pct_change().fillna(0.0)
+	return add_trend_columns(weekly)
+
+def add_trend_columns(weekly):
+	"""view_to_purchase and week-over-week change for a rollup sorted by (product, week)"""
+	sales = weekly["sales"].to_numpy(dtype="float64")
+	views = weekly["views"].to_numpy(dtype="float64")
+	weekly["view_to_purchase"] = np.divide(views, sales, out=np.full(len(weekly), np.nan), where=sales > 0)
+	prev = weekly.groupby("product", sort=False, observed=True)["sales"].shift().to_numpy(dtype="float64")
+	with np.errstate(divide="ignore", invalid="ignore"):
+		pct = sales / prev - 1.0
+	weekly["sales_pct_change"] = np.where(np.isnan(pct), 0.0, pct)
 	weekly["trend_score"] = weekly["sales_pct_change"]
 	return weekly
 
-def find_trending(weekly):
-	latest = weekly.sort_values("week").groupby("product").tail(1)
-	top_rising = latest.sort_values("trend_score", ascending=False).head(10)
-	top_falling = latest.sort_values("trend_score", ascending=True).head(10)
-	return top_rising, top_falling
\ No newline at end of file
+def _weekly_partials(chunk, centroids):
+	"""Mergeable per-chunk state: sums/first per product-week plus compressed price counts"""
+	keys = ["product","week"]
+	sums = (chunk.groupby(keys, observed=True, sort=False)
+		.agg(sales=("sales","sum"),
+			 views=("views","sum"),
+			 category=("category","first")))
+	prices = chunk.groupby(keys + ["price"], observed=True, sort=False).size().rename("n")
+	return sums, compress_prices(prices, centroids)
+
+def _merge_partials(partials, centroids):
+	keys = ["product","week"]
+	sums = (pd.concat([sums for sums, _ in partials]).groupby(level=keys, observed=True, sort=False)
+		.agg(sales=("sales","sum"),
+			 views=("views","sum"),
+			 category=("category","first")))
+	prices = (pd.concat([prices for _, prices in partials])
+		.groupby(level=keys + ["price"], observed=True, sort=False).sum())
+	return sums, compress_prices(prices, centroids)
+
+def compress_prices(prices, centroids=DEFAULT_PRICE_CENTROIDS):
+	"""Cap each product-week of a (product, week, price) count Series at `centroids` weighted prices.
+
+	Product-weeks with more distinct prices are folded into count-weighted
+	mean prices whose buckets narrow towards the median (t-digest style), so
+	weighted_median() of the result stays close to the exact median. Smaller
+	product-weeks are returned unchanged.
+	"""
+	keys = ["product","week"]
+	over = prices.groupby(level=keys, observed=True, sort=False).transform("size").to_numpy() > centroids
+	if not over.any():
+		return prices
+	big = prices[over].sort_index()
+	counts = big.to_numpy()
+	groups = big.groupby(level=keys, observed=True, sort=False)
+	# quantile at the middle of each price's mass, mapped so buckets shrink around q=0.5
+	q = 2 * (groups.cumsum().to_numpy() - counts / 2) / groups.transform("sum").to_numpy() - 1
+	bucket = np.floor(centroids / 2 * (1 + np.sign(q) * np.sqrt(np.abs(q)))).clip(0, centroids - 1)
+	values = big.index.get_level_values("price").to_numpy(dtype="float64")
+	folded = (pd.DataFrame({"product": big.index.get_level_values("product"),
+			"week": big.index.get_level_values("week"),
+			"bucket": bucket, "total": values * counts, "n": counts})
+		.groupby(keys + ["bucket"], observed=True, sort=False)[["total","n"]].sum())
+	index = pd.MultiIndex.from_arrays([folded.index.get_level_values("product"),
+		folded.index.get_level_values("week"), folded["total"] / folded["n"]], names=keys + ["price"])
+	return pd.concat([prices[~over], pd.Series(folded["n"].to_numpy(), index=index, name=prices.name)])
+
+def weighted_median(prices):
+	"""Exact per-(product, week) median from a Series of price counts indexed (product, week, price)"""
+	prices = prices.sort_index()
+	counts = prices.to_numpy()
+	values = prices.index.get_level_values("price").to_numpy(dtype="float64")
+	groups = prices.groupby(level=["product","week"], observed=True, sort=False)
+	total = groups.transform("sum").to_numpy()
+	upto = groups.cumsum().to_numpy()
+	before = upto - counts
+	lo = (total - 1) // 2
+	hi = total // 2
+	at_lo = (before <= lo) & (lo < upto)
+	at_hi = (before <= hi) & (hi < upto)
+	index = prices.index.droplevel("price")
+	lo_values = pd.Series(values[at_lo], index=index[at_lo])
+	hi_values = pd.Series(values[at_hi], index=index[at_hi])
+	return (lo_values + hi_values) / 2
+
+@timed("compute_weekly_chunked")
+def compute_weekly_chunked(file_or_path, chunksize=DEFAULT_CHUNKSIZE, centroids=DEFAULT_PRICE_CENTROIDS):
+	"""compute_weekly(load_data(...)) without holding the raw rows in memory.
+
+	The CSV is read `chunksize` rows at a time; each chunk is reduced to
+	per product-week sums and at most `centroids` weighted prices (see
+	compress_prices()), so peak memory tracks distinct product-weeks rather
+	than the input row count. The median price is exact for product-weeks
+	with up to `centroids` distinct prices and approximate beyond that.
+	Partials are merged MERGE_FANIN at a time as a tree, so each row is
+	re-grouped O(log chunks) times instead of once per chunk.
+	"""
+	# (level, partial) pairs; MERGE_FANIN partials of one level merge into one of the next
+	stack = []
+	# partials key products by integer code (position in `products`): grouping ints is far cheaper
+	products = pd.Index([], dtype=object)
+	categories = set()
+	for chunk in pd.read_csv(file_or_path, chunksize=chunksize):
+		chunk = apply_schema(add_week(chunk), categorical=False)
+		chunk = chunk[chunk["product"].notna()]
+		products = products.append(pd.Index(chunk["product"].unique()).difference(products))
+		chunk["product"] = products.get_indexer(chunk["product"])
+		categories.update(chunk["category"].dropna().unique())
+		stack.append((0, _weekly_partials(chunk, centroids)))
+		while len(stack) >= MERGE_FANIN and stack[-MERGE_FANIN][0] == stack[-1][0]:
+			level = stack[-1][0] + 1
+			merged = _merge_partials([partial for _, partial in stack[-MERGE_FANIN:]], centroids)
+			stack[-MERGE_FANIN:] = [(level, merged)]
+	if not stack:
+		return compute_weekly(load_data(file_or_path))
+	sums, prices = _merge_partials([partial for _, partial in stack], centroids)
+	sums.insert(2, "price", weighted_median(prices).reindex(sums.index))
+	weekly = sums.reset_index()
+	weekly["product"] = pd.Categorical(products[weekly["product"]], categories=products.sort_values())
+	weekly["category"] = pd.Categorical(weekly["category"], categories=sorted(categories))
+	weekly = weekly.sort_values(["product","week"], ignore_index=True)
+	return add_trend_columns(apply_schema(weekly))
+
+@timed("find_trending")
+def find_trending(weekly, k=10):
+	"""Top-k rising and falling products by trend_score in each product's latest week"""
+	# sort=True codes follow the same week order sort_values("week") would use
+	week_codes, _ = pd.factorize(weekly["week"], sort=True)
+	latest_rows = (pd.Series(week_codes, index=weekly.index)
+		.groupby(weekly["product"], observed=True, sort=False).idxmax())
+	latest = weekly.loc[latest_rows.to_numpy()]
+	top_rising = latest.nlargest(k, "trend_score")
+	top_falling = latest.nsmallest(k, "trend_score")
+	return top_rising, top_falling
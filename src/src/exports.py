@@ -0,0 +1,190 @@
+import atexit
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+
+from .instrumentation import timed
+from .result_cache import cached_call
+
+try:
+	import pyarrow as pa
+	import pyarrow.parquet as pq
+except ImportError:  # CSV exports work without pyarrow
+	pa = None
+	pq = None
+
+DEFAULT_CHUNK_ROWS = 100_000
+READ_CHUNK_BYTES = 1024 * 1024
+
+# format: (label, file extension, MIME type, needs pyarrow)
+EXPORT_FORMATS = {
+	"csv": ("CSV", ".csv", "text/csv", False),
+	"csv.gz": ("CSV (gzip)", ".csv.gz", "application/gzip", False),
+	"parquet": ("Parquet", ".parquet", "application/vnd.apache.parquet", True),
+	"arrow": ("Arrow IPC", ".arrow", "application/vnd.apache.arrow.file", True),
+}
+
+
+def available_formats():
+	return [fmt for fmt, (*_, needs_arrow) in EXPORT_FORMATS.items() if pa is not None or not needs_arrow]
+
+
+class _ChunkSink:
+	"""Write-only file object whose contents are drained chunk by chunk.
+
+	Keeps the absolute position for tell(), which the Parquet and Arrow
+	writers use to record offsets in their footers.
+	"""
+
+	def __init__(self):
+		self.closed = False
+		self._chunks = []
+		self._position = 0
+
+	def write(self, data):
+		data = bytes(data)
+		self._chunks.append(data)
+		self._position += len(data)
+		return len(data)
+
+	def tell(self):
+		return self._position
+
+	def flush(self):
+		pass
+
+	def close(self):
+		self.closed = True
+
+	def writable(self):
+		return True
+
+	def drain(self):
+		data = b"".join(self._chunks)
+		self._chunks.clear()
+		return data
+
+
+def _row_chunks(frame, chunk_rows):
+	# at least one (possibly empty) chunk, so headers and schemas are always written
+	for start in range(0, max(len(frame), 1), chunk_rows):
+		yield start, frame.iloc[start:start + chunk_rows]
+
+
+def _csv_chunks(frame, chunk_rows, compress):
+	sink = _ChunkSink()
+	out = gzip.GzipFile(fileobj=sink, mode="wb", mtime=0) if compress else sink
+	for start, chunk in _row_chunks(frame, chunk_rows):
+		out.write(chunk.to_csv(index=False, header=start == 0).encode())
+		yield sink.drain()
+	out.close()
+	yield sink.drain()
+
+
+def _arrow_chunks(frame, chunk_rows, fmt):
+	sink = _ChunkSink()
+	schema = pa.Schema.from_pandas(frame, preserve_index=False)
+	if fmt == "parquet":
+		writer = pq.ParquetWriter(sink, schema)
+	else:
+		writer = pa.ipc.new_file(sink, schema)
+	with writer:
+		for _, chunk in _row_chunks(frame, chunk_rows):
+			writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+			yield sink.drain()
+	yield sink.drain()
+
+
+def iter_export(frame, fmt, chunk_rows=DEFAULT_CHUNK_ROWS):
+	"""Serialized `frame` as byte chunks of about `chunk_rows` rows each, so large tables stream"""
+	if fmt not in EXPORT_FORMATS:
+		raise ValueError(f"unknown export format {fmt!r}")
+	if fmt in ("csv", "csv.gz"):
+		chunks = _csv_chunks(frame, chunk_rows, compress=fmt == "csv.gz")
+	elif pa is None:
+		raise ValueError(f"{fmt} export needs pyarrow")
+	else:
+		chunks = _arrow_chunks(frame, chunk_rows, fmt)
+	return (chunk for chunk in chunks if chunk)
+
+
+def write_export(frame, fmt, path, chunk_rows=DEFAULT_CHUNK_ROWS):
+	"""Stream `frame` to the file at `path` chunk by chunk; the file appears complete or not at all"""
+	tmp_path = f"{path}.tmp-{os.getpid()}"
+	with open(tmp_path, "wb") as out:
+		for chunk in iter_export(frame, fmt, chunk_rows):
+			out.write(chunk)
+	os.replace(tmp_path, path)
+	return path
+
+
+def iter_file(path, chunk_bytes=READ_CHUNK_BYTES):
+	"""Contents of the file at `path` in blocks of `chunk_bytes`"""
+	with open(path, "rb") as f:
+		yield from iter(lambda: f.read(chunk_bytes), b"")
+
+
+_export_dir = None
+
+
+def _export_path(data_key, table, fmt, params):
+	global _export_dir
+	if _export_dir is None:
+		_export_dir = tempfile.mkdtemp(prefix="dashboard-exports-")
+		atexit.register(shutil.rmtree, _export_dir, ignore_errors=True)
+	key = repr((data_key, table, fmt, sorted(params.items())))
+	return os.path.join(_export_dir, hashlib.sha1(key.encode()).hexdigest() + EXPORT_FORMATS[fmt][1])
+
+
+def _export(make_frame, data_key, table, fmt, **params):
+	path = _export_path(data_key, table, fmt, params)
+	if not os.path.exists(path):
+		with timed(f"export.{fmt}"):
+			write_export(make_frame(), fmt, path)
+	return path
+
+
+def cached_export(data_key, table, make_frame, fmt, **params):
+	"""Path of the export file of `make_frame()`, written on first request and shared per dataset version.
+
+	`table` names the exported frame and `params` are whatever else it
+	depends on (e.g. a forecast horizon); together with `data_key` and
+	`fmt` they form the cache key, so make_frame only runs on a miss. The
+	file is streamed to a per-process temporary directory (removed at
+	exit), so the serialized export is never held in memory as a whole.
+	"""
+	return cached_call(_export, data_key, make_frame, data_key, table=table, fmt=fmt, **params)
+
+
+def download_control(st, label, table, data_key, make_frame, file_name, key_params=None, help=None):
+	"""Format picker plus a download button that serializes only once the user asks for the file.
+
+	`st` is the streamlit module. Until "Prepare" is clicked nothing is
+	serialized; afterwards this session's reruns reuse the cached file
+	until the dataset version, format or key_params change. Streamlit's
+	download_button reads whatever it is given into one in-memory buffer,
+	so the button holds the whole file even though writing it streamed;
+	the service's export route streams it from disk instead.
+	"""
+	key_params = key_params or {}
+	formats = available_formats()
+	fmt = st.selectbox(f"{label} format", formats, format_func=lambda f: EXPORT_FORMATS[f][0],
+		key=f"export_format:{table}")
+	request = (data_key, fmt, tuple(sorted(key_params.items())))
+	state_key = f"export_request:{table}"
+	if st.session_state.get(state_key) != request:
+		if not st.button(f"Prepare {label}", key=f"export_prepare:{table}", help=help):
+			return
+		st.session_state[state_key] = request
+	_, extension, mime, _ = EXPORT_FORMATS[fmt]
+	with open(cached_export(data_key, table, make_frame, fmt, **key_params), "rb") as data:
+		st.download_button(
+			f"📥 Download {label}",
+			data=data,
+			file_name=file_name + extension,
+			mime=mime,
+			key=f"export_download:{table}",
+			help=help
+		)
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from .instrumentation import timed
+
+
+def forecast_arrays(weekly_data, days_to_predict=30, confidence=0.9, alpha=0.3, min_points=4):
+	"""Exponential-smoothing forecasts for every product at once.
+
+	Returns (products, predictions, upper_bound, lower_bound); the three
+	arrays are products x weeks-ahead. Only products with at least
+	`min_points` weeks are forecast, in first-appearance order.
+	"""
+	product_codes, products = pd.factorize(weekly_data['product'])
+	week_codes, _ = pd.factorize(weekly_data['week'], sort=True)
+	order = np.lexsort((week_codes, product_codes))
+	sales = weekly_data['sales'].to_numpy()[order]
+	counts = np.bincount(product_codes, minlength=len(products))
+	ends = np.cumsum(counts) - 1
+
+	ready = np.flatnonzero(counts >= min_points)
+	# trailing window of each product's last `min_points` weeks, oldest first
+	tail = sales[ends[ready, None] - np.arange(min_points - 1, -1, -1)]
+
+	horizon = days_to_predict // 7  # Convert days to weeks
+	predictions = np.empty((len(ready), horizon), dtype=np.float64)
+	current = tail[:, -1]
+	for step in range(horizon):
+		current = alpha * current + (1 - alpha) * current
+		predictions[:, step] = current
+
+	spread = (np.std(tail, axis=1) * (1 - confidence))[:, None]
+	return np.asarray(products)[ready], predictions, predictions + spread, predictions - spread
+
+
+@timed("predict_sales_trends")
+def predict_sales_trends(weekly_data, days_to_predict=30, confidence=0.9):
+	"""Enhanced prediction using simple exponential smoothing with confidence intervals"""
+	products, predictions, upper, lower = forecast_arrays(weekly_data, days_to_predict, confidence)
+	return {
+		product: {
+			'predictions': list(predictions[i]),
+			'upper_bound': list(upper[i]),
+			'lower_bound': list(lower[i]),
+			'confidence': confidence
+		}
+		for i, product in enumerate(products)
+	}
@@ -0,0 +1,217 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import ContextDecorator
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# latency percentiles are taken over the most recent samples of each stage
+SAMPLES_PER_STAGE = 1_024
+EXPORT_INTERVAL = 10.0
+JSONL_ENV = "PERF_METRICS_JSONL"
+PROMETHEUS_ENV = "PERF_METRICS_PROM"
+QUANTILES = (0.5, 0.95, 0.99)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+_statm = {}
+
+
+def rss_bytes():
+	"""Resident set size of this process, or None where /proc is unavailable"""
+	# one descriptor per process (forked workers must not share the parent's)
+	pid = os.getpid()
+	try:
+		fd = _statm.get(pid)
+		if fd is None:
+			fd = _statm[pid] = os.open("/proc/self/statm", os.O_RDONLY)
+		return int(os.pread(fd, 128, 0).split()[1]) * _PAGE_SIZE
+	except (OSError, IndexError, ValueError):
+		return None
+
+
+class _Stage:
+	__slots__ = ("count", "total", "max", "samples", "rss_delta")
+
+	def __init__(self):
+		self.count = 0
+		self.total = 0.0
+		self.max = 0.0
+		self.samples = deque(maxlen=SAMPLES_PER_STAGE)
+		self.rss_delta = 0
+
+
+class Registry:
+	"""Process-wide latency and memory counters per named stage"""
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._stages = {}
+		self._last_export = 0.0
+
+	def record(self, stage, seconds, rss_delta=None):
+		with self._lock:
+			stats = self._stages.get(stage)
+			if stats is None:
+				stats = self._stages[stage] = _Stage()
+			stats.count += 1
+			stats.total += seconds
+			stats.max = max(stats.max, seconds)
+			stats.samples.append(seconds)
+			if rss_delta is not None:
+				stats.rss_delta += rss_delta
+
+	def reset(self):
+		with self._lock:
+			self._stages.clear()
+
+	def snapshot(self):
+		"""{stage: count, total/mean/max and percentile seconds, cumulative RSS growth}"""
+		with self._lock:
+			stages = {name: (s.count, s.total, s.max, np.array(s.samples), s.rss_delta)
+				for name, s in self._stages.items()}
+		snapshot = {}
+		for name, (count, total, peak, samples, rss_delta) in sorted(stages.items()):
+			quantiles = np.quantile(samples, QUANTILES) if len(samples) else [np.nan] * len(QUANTILES)
+			snapshot[name] = {
+				"count": count,
+				"total_s": total,
+				"mean_s": total / count if count else np.nan,
+				"max_s": peak,
+				**{f"p{round(q * 100)}_s": float(v) for q, v in zip(QUANTILES, quantiles)},
+				"rss_delta_bytes": rss_delta,
+			}
+		return snapshot
+
+	def frame(self):
+		"""snapshot() as a table in milliseconds, slowest p95 first, for display"""
+		snapshot = self.snapshot()
+		if not snapshot:
+			return pd.DataFrame(columns=["stage", "count", "p50_ms", "p95_ms", "p99_ms", "max_ms", "rss_delta_mb"])
+		table = pd.DataFrame.from_dict(snapshot, orient="index").rename_axis("stage").reset_index()
+		for column in ("p50", "p95", "p99", "max"):
+			table[f"{column}_ms"] = table[f"{column}_s"] * 1000
+		table["rss_delta_mb"] = table["rss_delta_bytes"] / 2**20
+		return (table[["stage", "count", "p50_ms", "p95_ms", "p99_ms", "max_ms", "rss_delta_mb"]]
+			.sort_values("p95_ms", ascending=False, ignore_index=True))
+
+	def prometheus_text(self, prefix="dashboard"):
+		"""Snapshot in the Prometheus text exposition format"""
+		lines = [
+			f"# HELP {prefix}_stage_seconds Wall time of instrumented stages.",
+			f"# TYPE {prefix}_stage_seconds summary",
+		]
+		snapshot = self.snapshot()
+		for name, stats in snapshot.items():
+			label = name.replace("\\", "\\\\").replace('"', '\\"')
+			for q in QUANTILES:
+				lines.append(f'{prefix}_stage_seconds{{stage="{label}",quantile="{q}"}} {stats[f"p{round(q * 100)}_s"]:.9g}')
+			lines.append(f'{prefix}_stage_seconds_sum{{stage="{label}"}} {stats["total_s"]:.9g}')
+			lines.append(f'{prefix}_stage_seconds_count{{stage="{label}"}} {stats["count"]}')
+		lines += [
+			f"# HELP {prefix}_stage_rss_delta_bytes Cumulative resident memory growth during stages.",
+			f"# TYPE {prefix}_stage_rss_delta_bytes gauge",
+		]
+		for name, stats in snapshot.items():
+			label = name.replace("\\", "\\\\").replace('"', '\\"')
+			lines.append(f'{prefix}_stage_rss_delta_bytes{{stage="{label}"}} {stats["rss_delta_bytes"]}')
+		rss = rss_bytes()
+		if rss is not None:
+			lines += [
+				f"# HELP {prefix}_resident_memory_bytes Resident memory of the process.",
+				f"# TYPE {prefix}_resident_memory_bytes gauge",
+				f"{prefix}_resident_memory_bytes {rss}",
+			]
+		return "\n".join(lines) + "\n"
+
+	def export_jsonl(self, path):
+		"""Append one snapshot line to a JSONL file"""
+		record = {
+			"time": datetime.now().isoformat(timespec="milliseconds"),
+			"pid": os.getpid(),
+			"rss_bytes": rss_bytes(),
+			"stages": self.snapshot(),
+		}
+		with open(path, "a") as f:
+			f.write(json.dumps(record, allow_nan=False, default=str) + "\n")
+
+	def export_prometheus(self, path):
+		"""Rewrite a Prometheus textfile (e.g. for node_exporter's textfile collector)"""
+		tmp_path = f"{path}.tmp-{os.getpid()}"
+		with open(tmp_path, "w") as f:
+			f.write(self.prometheus_text())
+		os.replace(tmp_path, path)
+
+	def maybe_export(self, interval=EXPORT_INTERVAL):
+		"""Export to the files named by PERF_METRICS_JSONL / PERF_METRICS_PROM, at most every `interval` s"""
+		jsonl_path, prom_path = os.environ.get(JSONL_ENV), os.environ.get(PROMETHEUS_ENV)
+		if not (jsonl_path or prom_path):
+			return False
+		now = time.monotonic()
+		with self._lock:
+			if now - self._last_export < interval:
+				return False
+			self._last_export = now
+		if jsonl_path:
+			self.export_jsonl(jsonl_path)
+		if prom_path:
+			self.export_prometheus(prom_path)
+		return True
+
+
+registry = Registry()
+
+
+class timed(ContextDecorator):
+	"""Record the wall time and RSS growth of a block or function under `stage`.
+
+		with timed("plotly.sales_chart"):
+			...
+
+		@timed("compute_weekly")
+		def compute_weekly(df): ...
+	"""
+
+	def __init__(self, stage, registry=None):
+		self.stage = stage
+		self.registry = registry
+		self._starts = threading.local()
+
+	def __enter__(self):
+		# a stack per thread, so one decorated function can run concurrently and recursively
+		stack = self._starts.__dict__.setdefault("stack", [])
+		stack.append((time.perf_counter(), rss_bytes()))
+		return self
+
+	def __exit__(self, *exc):
+		start, rss_start = self._starts.stack.pop()
+		elapsed = time.perf_counter() - start
+		rss_end = rss_bytes() if rss_start is not None else None
+		(self.registry or registry).record(self.stage, elapsed, None if rss_end is None else rss_end - rss_start)
+		return False
+
+	def start(self):
+		"""Non-`with` form for spans that cover a whole script run; finish with stop()"""
+		return self.__enter__()
+
+	def stop(self):
+		self.__exit__(None, None, None)
+
+
+def perf_panel(container, registry=None):
+	"""Render the stage table into a Streamlit container (e.g. st.sidebar)"""
+	registry = registry or globals()["registry"]
+	panel = container.expander("⏱️ Performance", expanded=True)
+	table = registry.frame()
+	if table.empty:
+		panel.caption("No timings recorded yet")
+	else:
+		panel.dataframe(table.round(2), hide_index=True, use_container_width=True)
+	rss = rss_bytes()
+	if rss is not None:
+		panel.caption(f"Process memory: {rss / 2**20:,.0f} MB")
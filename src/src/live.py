@@ -0,0 +1,102 @@
+"""Shared live feed and per-run controls for the real-time dashboards.
+
+A dashboard builds its feed once with start_feed() inside st.cache_resource,
+so every session reads the same ticks. Each run is wrapped in
+start_run() / finish_run() and calls frequency_slider() and live_status().
+"""
+from datetime import timedelta
+
+import streamlit as st
+
+from .instrumentation import timed, registry, perf_panel
+from .ring_buffer import RingBuffer
+from .streaming import source_from_spec
+from .ticker import Ticker
+
+# Bounded live history: oldest ticks are dropped once either limit is reached
+HISTORY_CAPACITY = 50_000
+HISTORY_MAX_AGE = timedelta(hours=24)
+
+
+def start_feed(columns, simulate, interval, on_tick=None, source_spec=None,
+		capacity=HISTORY_CAPACITY, max_age=HISTORY_MAX_AGE):
+	"""Started Ticker over a bounded RingBuffer of `columns`, and the source it polls.
+
+	`simulate()` produces one tick of events; `source_spec` (e.g. the
+	LIVE_SOURCE environment variable, see source_from_spec()) may name a
+	real event stream instead. `on_tick(batch, history)` runs under the
+	feed lock after every append, for state kept in step with the history.
+	"""
+	history = RingBuffer(columns, capacity, max_age=max_age)
+	source = source_from_spec(source_spec, columns, simulate)
+	feed = Ticker(
+		source.start().poll,
+		history,
+		interval,
+		on_tick=None if on_tick is None else lambda batch: on_tick(batch, history)
+	)
+	return feed.start(), source
+
+
+def frequency_slider(feed, frequencies, label="Update Frequency", key="update_frequency"):
+	"""Select slider for the shared feed's rate; returns the interval live fragments should run at.
+
+	Only moving the slider changes the rate: the feed is shared, so each
+	session's slider starts at the current rate instead of resetting it.
+	"""
+	labels = {seconds: name for name, seconds in frequencies.items()}
+
+	def apply():
+		feed.interval = frequencies[st.session_state[key]]
+
+	st.session_state[key] = labels[feed.interval]
+	st.select_slider(label, options=list(frequencies), key=key, on_change=apply)
+	return feed.interval
+
+
+def live_status(feed, source, interval):
+	"""Fragment with the feed's last update and any feed or source errors.
+
+	It also reruns the whole script once another session has changed the
+	shared rate, so every fragment picks up the new interval.
+	"""
+	@st.fragment(run_every=interval)
+	@timed("fragment.live_status")
+	def status():
+		if feed.interval != interval:
+			st.rerun()
+		if feed.error is not None:
+			st.warning(f"Live feed error: {feed.error}")
+		if source.error is not None:
+			st.warning(f"Live source stopped: {source.error}")
+		if source.bad_records:
+			st.caption(f"⚠️ {source.bad_records:,} malformed events skipped")
+		if feed.last_update is None:
+			st.caption("🔄 Waiting for live events")
+		else:
+			st.caption(f"🔄 Last update: {feed.last_update.strftime('%Y-%m-%d %H:%M:%S')}")
+
+	status()
+
+
+def start_run():
+	"""Start timing this script run as the "rerun" stage; pass the timer to finish_run()"""
+	return timed("rerun").start()
+
+
+def finish_run(timer, interval, show_perf):
+	"""Stop the run timer and add the sidebar fragment that exports stage timings.
+
+	The fragment refreshes on the live schedule. It writes the PERF_METRICS_*
+	export files and, with `show_perf`, renders the performance panel.
+	"""
+	timer.stop()
+
+	@st.fragment(run_every=interval)
+	def live_perf():
+		registry.maybe_export()
+		if show_perf:
+			perf_panel(st)
+
+	with st.sidebar:
+		live_perf()
@@ -0,0 +1,95 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .ecommerce_trends import compute_weekly
+from .instrumentation import timed
+
+# below this many rows process start-up and transfer cost more than the rollup itself
+MIN_PARALLEL_ROWS = 2_000_000
+LABEL_COLUMNS = ("product", "category")
+VALUE_COLUMNS = ("week", "sales", "views", "price")
+
+
+def default_workers():
+	return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+
+def product_partitions(products, n_partitions):
+	"""Partition number of every row, from a stable hash of its product label"""
+	hashes = pd.util.hash_array(np.asarray(products.cat.categories, dtype=object))
+	return (hashes % n_partitions).astype(np.int32)[products.cat.codes.to_numpy()]
+
+
+def _to_shared(arrays):
+	"""Copy {name: array} into one shared memory block; returns (block, layout)"""
+	layout, offset = {}, 0
+	for name, values in arrays.items():
+		offset += -offset % 8  # keep every column 8-byte aligned
+		layout[name] = (offset, values.dtype.str, len(values))
+		offset += values.nbytes
+	block = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+	for name, values in arrays.items():
+		start, dtype, n = layout[name]
+		np.ndarray(n, dtype=dtype, buffer=block.buf, offset=start)[:] = values
+	return block, layout
+
+
+def _weekly_partition(block_name, layout, start, stop, labels):
+	# pool workers share the parent's resource tracker, so attaching does not
+	# take ownership: the parent alone unlinks the block
+	block = shared_memory.SharedMemory(name=block_name)
+	try:
+		columns = {}
+		for name, (offset, dtype, n) in layout.items():
+			values = np.ndarray(n, dtype=dtype, buffer=block.buf, offset=offset)[start:stop]
+			if name in labels:
+				columns[name] = pd.Categorical.from_codes(values.copy(), categories=labels[name])
+			else:
+				columns[name] = values.copy()
+		return compute_weekly(pd.DataFrame(columns))
+	finally:
+		block.close()
+
+
+@timed("compute_weekly_parallel")
+def compute_weekly_parallel(df, workers=None, min_rows=MIN_PARALLEL_ROWS):
+	"""compute_weekly() split by product hash across a process pool.
+
+	Rows are grouped by partition into one shared-memory block of columnar
+	arrays (label columns as categorical codes), each worker rolls up its
+	contiguous slice of it, and the partial rollups are concatenated back
+	into (product, week) order. The result is identical to compute_weekly();
+	small inputs, a single worker and frames whose label columns are not
+	categorical (i.e. not from load_data()) take the serial path.
+	"""
+	workers = default_workers() if workers is None else workers
+	if (workers <= 1 or len(df) < min_rows
+			or not all(isinstance(df[c].dtype, pd.CategoricalDtype) for c in LABEL_COLUMNS)):
+		return compute_weekly(df)
+
+	partitions = product_partitions(df["product"], workers)
+	# stable, so rows keep their input order within a partition ("first" category)
+	order = np.argsort(partitions, kind="stable")
+	bounds = np.searchsorted(partitions[order], np.arange(workers + 1))
+	arrays = {name: df[name].cat.codes.to_numpy()[order] for name in LABEL_COLUMNS}
+	arrays.update({name: df[name].to_numpy()[order] for name in VALUE_COLUMNS})
+	labels = {name: df[name].cat.categories for name in LABEL_COLUMNS}
+
+	block, layout = _to_shared(arrays)
+	del arrays
+	try:
+		with ProcessPoolExecutor(workers) as pool:
+			parts = list(pool.map(_weekly_partition, *zip(*[
+				(block.name, layout, bounds[i], bounds[i + 1], labels)
+				for i in range(workers) if bounds[i] < bounds[i + 1]
+			])))
+	finally:
+		block.close()
+		block.unlink()
+
+	weekly = pd.concat(parts, ignore_index=True)
+	return weekly.sort_values(["product", "week"], kind="stable", ignore_index=True)
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+
+class ProductIndex:
+	"""CSR-style row index over a frame: one contiguous slice of positions per product.
+
+	Built once per dataset version in O(n); afterwards `rows(product)` costs
+	O(rows of that product) instead of a boolean scan of the whole frame.
+	Rows of a product keep their frame order, or are ordered by `sort_by`.
+	"""
+
+	def __init__(self, frame, column="product", sort_by=None):
+		self.frame = frame
+		codes, uniques = pd.factorize(frame[column])
+		if sort_by is None:
+			order = np.argsort(codes, kind="stable")
+		else:
+			sort_codes, _ = pd.factorize(frame[sort_by], sort=True)
+			order = np.lexsort((sort_codes, codes))
+		# factorize marks missing keys with -1; they sort first and are skipped
+		self.positions = order[np.count_nonzero(codes < 0):]
+		counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+		self.offsets = np.concatenate([[0], np.cumsum(counts)])
+		self.products = list(uniques)
+		self._codes = {product: i for i, product in enumerate(self.products)}
+
+	@property
+	def nbytes(self):
+		return self.positions.nbytes + self.offsets.nbytes
+
+	def __len__(self):
+		return len(self.products)
+
+	def __contains__(self, product):
+		return product in self._codes
+
+	def positions_of(self, product):
+		code = self._codes.get(product)
+		if code is None:
+			return self.positions[:0]
+		return self.positions[self.offsets[code]:self.offsets[code + 1]]
+
+	def rows(self, product):
+		"""Rows of one product, equivalent to frame[frame[column] == product] (plus sort_by order)"""
+		return self.frame.iloc[self.positions_of(product)]
@@ -0,0 +1,66 @@
+import sys
+import threading
+
+import pandas as pd
+
+from .data_cache import LRUCache, frame_nbytes
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+_MISSING = object()
+
+
+def result_nbytes(value):
+	"""Rough deep size of a cached result (frames, arrays, containers of them)"""
+	if isinstance(value, pd.DataFrame):
+		return frame_nbytes(value)
+	if isinstance(value, pd.Series):
+		return int(value.memory_usage(deep=True))
+	if hasattr(value, "nbytes"):  # ndarrays, NumPy scalars, ProductIndex
+		return int(value.nbytes)
+	if isinstance(value, (list, tuple)):
+		return sys.getsizeof(value) + sum(result_nbytes(item) for item in value)
+	if isinstance(value, dict):
+		return sys.getsizeof(value) + sum(result_nbytes(k) + result_nbytes(v) for k, v in value.items())
+	return sys.getsizeof(value)
+
+
+_results = LRUCache(DEFAULT_MAX_BYTES, sizeof=result_nbytes)
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def cached_call(fn, data_key, *args, cache=None, **params):
+	"""fn(*args, **params), shared across sessions and keyed by (fn, data_key, params).
+
+	`args` must be fully determined by `data_key` (the dataset fingerprint),
+	since they are not part of the key. Concurrent callers of the same key
+	wait for one computation instead of each running it. Results are
+	shared, so callers must not mutate them.
+	"""
+	cache = _results if cache is None else cache
+	key = (f"{fn.__module__}.{fn.__qualname__}", data_key, tuple(sorted(params.items())))
+	result = cache.get(key, _MISSING)
+	if result is not _MISSING:
+		return result
+	with _inflight_lock:
+		lock = _inflight.setdefault(key, threading.Lock())
+	with lock:
+		result = cache.get(key, _MISSING, count=False)
+		if result is _MISSING:
+			result = cache.put(key, fn(*args, **params))
+	with _inflight_lock:
+		_inflight.pop(key, None)
+	return result
+
+
+def invalidate_results(data_key=None, cache=None):
+	"""Drop cached results for one dataset fingerprint, or all of them"""
+	cache = _results if cache is None else cache
+	if data_key is None:
+		cache.clear()
+	else:
+		cache.discard_where(lambda key: key[1] == data_key)
+
+
+def result_cache_stats(cache=None):
+	return (_results if cache is None else cache).stats()
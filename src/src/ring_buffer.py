@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+
+class RingBuffer:
+	"""Fixed-capacity columnar history with amortized O(1) appends.
+
+	Each column is a preallocated NumPy array of twice the capacity. Rows
+	are written linearly and, when the end is reached, the live window is
+	moved back to the front once, so the retained rows are always one
+	contiguous slice and `view()` never has to copy. Retention is bounded
+	by `capacity` rows and, optionally, by `max_age` measured against the
+	newest value of `time_column` (which must be appended in order).
+
+	Columns declared as "category" are stored as int32 codes against a
+	per-column list of labels that only grows, and come back from
+	`to_frame()` as pandas categoricals.
+	"""
+
+	def __init__(self, columns, capacity, max_age=None, time_column="timestamp"):
+		if capacity <= 0:
+			raise ValueError("capacity must be positive")
+		self.dtypes = {name: dtype if dtype == "category" else np.dtype(dtype) for name, dtype in columns.items()}
+		self.capacity = int(capacity)
+		self.max_age = None if max_age is None else pd.Timedelta(max_age).to_timedelta64()
+		self.time_column = time_column
+		self._labels = {name: {} for name, dtype in self.dtypes.items() if dtype == "category"}
+		self._arrays = {
+			name: np.empty(2 * self.capacity, dtype=np.int32 if name in self._labels else dtype)
+			for name, dtype in self.dtypes.items()
+		}
+		self._start = 0
+		self._stop = 0
+		# bumped on every change, so derived views can be cached per version
+		self.version = 0
+
+	def __len__(self):
+		return self._stop - self._start
+
+	@property
+	def empty(self):
+		return self._stop == self._start
+
+	@property
+	def columns(self):
+		return list(self.dtypes)
+
+	def append(self, rows):
+		"""Append a DataFrame, or a mapping of column -> scalar/array, as new rows"""
+		batch = {
+			name: self._encode(name, rows[name]) if name in self._labels
+			else np.atleast_1d(np.asarray(rows[name], dtype=dtype))
+			for name, dtype in self.dtypes.items()
+		}
+		n = len(next(iter(batch.values())))
+		if n == 0:
+			return self
+		if n >= self.capacity:
+			batch = {name: values[-self.capacity:] for name, values in batch.items()}
+			n = self.capacity
+			self._start = self._stop = 0
+		elif self._stop + n > 2 * self.capacity:
+			keep = min(len(self), self.capacity - n)
+			for values in self._arrays.values():
+				values[:keep] = values[self._stop - keep:self._stop]
+			self._start, self._stop = 0, keep
+		for name, values in batch.items():
+			self._arrays[name][self._stop:self._stop + n] = values
+		self._stop += n
+		self._start = max(self._start, self._stop - self.capacity)
+		if self.max_age is not None:
+			self._expire()
+		self.version += 1
+		return self
+
+	def _encode(self, name, values):
+		labels = self._labels[name]
+		local_codes, uniques = pd.factorize(np.atleast_1d(np.asarray(values, dtype=object)))
+		mapping = np.array([labels.setdefault(label, len(labels)) for label in uniques] + [-1], dtype=np.int32)
+		# factorize marks missing values with -1, which indexes the trailing -1 above
+		return mapping[local_codes]
+
+	def categories(self, name):
+		return list(self._labels[name])
+
+	def _expire(self):
+		times = self._arrays[self.time_column][self._start:self._stop]
+		cutoff = times[-1] - self.max_age
+		self._start += int(np.searchsorted(times, cutoff, side="left"))
+
+	def view(self, name, last=None):
+		"""Read-only, zero-copy array of the retained values (codes, for categoricals) of one column"""
+		start = self._start if last is None else max(self._start, self._stop - last)
+		values = self._arrays[name][start:self._stop]
+		values.flags.writeable = False
+		return values
+
+	def to_frame(self, last=None):
+		"""Retained rows (or only the newest `last` rows) as a DataFrame"""
+		return pd.DataFrame({
+			name: pd.Categorical.from_codes(self.view(name, last), categories=self.categories(name))
+			if name in self._labels else self.view(name, last)
+			for name in self.dtypes
+		})
+
+	def clear(self):
+		self._start = self._stop = 0
+		self.version += 1
@@ -0,0 +1,267 @@
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+# buckets are counted from a Monday midnight, so "W" buckets are the same
+# Monday-Sunday weeks as the week ordinals of load_data()
+BUCKET_ORIGIN = pd.Timestamp("1970-01-05")
+
+SALES_MEASURES = {"sales": "sales", "views": "views", "price": "price"}
+
+
+def bucket_width(resolution):
+	"""Width of a resolution such as "1min", "1h", "1D" or "W" (7 days)"""
+	return pd.Timedelta(7, "D") if resolution == "W" else pd.Timedelta(resolution)
+
+
+class RollupCube:
+	"""Running sums of measures per (dimension values..., time bucket) cell, at several resolutions.
+
+	`bucket` is one resolution or a sequence of them (finest first, e.g.
+	("1min", "1h", "1D", "W")); every row is folded into its bucket at each
+	of them and into an all-time cell, so any level can be read directly
+	without re-aggregating rows or finer buckets.
+
+	`update(rows)` folds a batch into its cells, and `retain(n)` retracts
+	the oldest rows beyond the newest n, so the cube can mirror a bounded
+	history such as a RingBuffer (call `retain(len(buffer))` after each
+	append). Both cost O(rows changed x levels); `query()` only reads the
+	cells of one level, never the rows. With retractable=False the per-row
+	log that retain() needs is not kept.
+
+	`measures` maps each measure name to a column of the batch or to a
+	function of the batch (e.g. revenue = sales * price). `dtypes` casts
+	batch columns first, so sums match a frame read back from a buffer
+	with the same schema. Every cell also counts its rows.
+	"""
+
+	def __init__(self, dimensions, measures, bucket="1min", time_column="timestamp", dtypes=None,
+			retractable=True, capacity=1024):
+		self.dimensions = tuple(dimensions)
+		self.measures = dict(measures)
+		self.resolutions = (bucket,) if isinstance(bucket, str) else tuple(bucket)
+		self.time_column = time_column
+		self.dtypes = dict(dtypes or {})
+		self.retractable = retractable
+		# bumped on every change, so derived views can be cached per version
+		self.version = 0
+		self._widths = [bucket_width(resolution).value for resolution in self.resolutions]
+		self._labels = {name: {} for name in self.dimensions}
+		# a cell key (dimension codes..., level, bucket) viewed as one opaque value, so whole
+		# batches of keys can be sorted and looked up with np.searchsorted
+		self._key_dtype = np.dtype((np.void, 8 * (len(self.dimensions) + 2)))
+		# per resolution, then for the all-time level: (sorted keys, their cells)
+		self._cells = [self._no_cells() for _ in range(len(self.resolutions) + 1)]
+		self._free = []
+		self._allocated = 0
+		self._keys = np.zeros((capacity, len(self.dimensions) + 2), dtype=np.int64)
+		self._counts = np.zeros(capacity, dtype=np.int64)
+		self._sums = np.zeros((capacity, len(self.measures)), dtype=np.float64)
+		# per appended batch: (cells of each row, one row per level; measure values of each row), oldest first
+		self._log = deque()
+		self._rows = 0
+
+	def __len__(self):
+		"""Rows currently folded into the cube"""
+		return self._rows
+
+	@property
+	def n_cells(self):
+		return sum(len(cells) for _, cells in self._cells)
+
+	@property
+	def nbytes(self):
+		return (self._keys.nbytes + self._counts.nbytes + self._sums.nbytes
+			+ sum(cells.nbytes + values.nbytes for cells, values in self._log))
+
+	def _column(self, rows, name):
+		values = np.atleast_1d(np.asarray(rows[name]))
+		dtype = self.dtypes.get(name)
+		if dtype is not None and dtype != "category":
+			values = values.astype(dtype, copy=False)
+		return values
+
+	def _encode(self, name, values):
+		labels = self._labels[name]
+		local_codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+		mapping = np.array([labels.setdefault(label, len(labels)) for label in uniques] + [-1], dtype=np.int64)
+		# missing labels get code -1 (as in RingBuffer), which queries leave out
+		return mapping[local_codes]
+
+	def _grow(self, needed):
+		size = len(self._counts)
+		if needed <= size:
+			return
+		size = max(needed, 2 * size)
+		self._keys = np.resize(self._keys, (size, self._keys.shape[1]))
+		self._counts = np.concatenate([self._counts, np.zeros(size - len(self._counts), dtype=np.int64)])
+		self._sums = np.concatenate([self._sums, np.zeros((size - len(self._sums), self._sums.shape[1]))])
+
+	def _no_cells(self):
+		return np.empty(0, dtype=self._key_dtype), np.empty(0, dtype=np.int64)
+
+	def _cell_ids(self, keys, level):
+		"""Cell of every key row at one level, allocating cells for keys not seen before"""
+		rows = np.ascontiguousarray(keys, dtype=np.int64).view(self._key_dtype).ravel()
+		unique, inverse = np.unique(rows, return_inverse=True)
+		known, known_cells = self._cells[level]
+		at = np.searchsorted(known, unique)
+		found = at < len(known)
+		found[found] = known[at[found]] == unique[found]
+		ids = np.empty(len(unique), dtype=np.int64)
+		ids[found] = known_cells[at[found]]
+		new = np.flatnonzero(~found)
+		if len(new):
+			new_keys = unique[new].view(np.int64).reshape(len(new), -1)
+			# reuse retracted cells first, then take the rest as one contiguous block
+			reused = min(len(new), len(self._free))
+			if reused:
+				ids[new[:reused]] = [self._free.pop() for _ in range(reused)]
+				self._keys[ids[new[:reused]]] = new_keys[:reused]
+			start, stop = self._allocated, self._allocated + len(new) - reused
+			self._grow(stop)
+			ids[new[reused:]] = np.arange(start, stop)
+			self._keys[start:stop] = new_keys[reused:]
+			self._allocated = stop
+			self._cells[level] = (np.insert(known, at[new], unique[new]), np.insert(known_cells, at[new], ids[new]))
+		return ids[inverse.ravel()]
+
+	def update(self, rows):
+		"""Fold a DataFrame, or a mapping of column -> array, into the cube"""
+		times = self._column(rows, self.time_column).astype("datetime64[ns]")
+		n = len(times)
+		if n == 0:
+			return self
+		offsets = times.view(np.int64) - BUCKET_ORIGIN.value
+		codes = [self._encode(name, self._column(rows, name)) for name in self.dimensions]
+		cells = np.empty((len(self._cells), n), dtype=np.int64)
+		for level in range(len(self._cells)):
+			# the all-time level has a single bucket, 0
+			buckets = offsets // self._widths[level] if level < len(self._widths) else np.zeros(n, dtype=np.int64)
+			keys = np.column_stack(codes + [np.full(n, level, dtype=np.int64), buckets])
+			cells[level] = self._cell_ids(keys, level)
+		batch = {name: self._column(rows, name) for name in self.dtypes if name in rows}
+		for source in self.measures.values():
+			if isinstance(source, str) and source not in batch:
+				batch[source] = self._column(rows, source)
+		values = np.column_stack([
+			np.broadcast_to(source(batch) if callable(source) else batch[source], n).astype(np.float64)
+			for source in self.measures.values()
+		]) if self.measures else np.empty((n, 0))
+		np.add.at(self._counts, cells.ravel(), 1)
+		np.add.at(self._sums, cells.ravel(), np.tile(values, (len(cells), 1)))
+		if self.retractable:
+			self._log.append((cells, values))
+		self._rows += n
+		self.version += 1
+		return self
+
+	def retain(self, n):
+		"""Retract all but the newest `n` rows"""
+		if not self.retractable:
+			raise ValueError("retain() needs a cube built with retractable=True")
+		excess = self._rows - max(int(n), 0)
+		if excess <= 0:
+			return self
+		touched = []
+		while excess > 0:
+			cells, values = self._log[0]
+			if cells.shape[1] <= excess:
+				self._log.popleft()
+			else:
+				self._log[0] = (cells[:, excess:], values[excess:])
+				cells, values = cells[:, :excess], values[:excess]
+			np.subtract.at(self._counts, cells.ravel(), 1)
+			np.subtract.at(self._sums, cells.ravel(), np.tile(values, (len(cells), 1)))
+			touched.append(cells.ravel())
+			excess -= cells.shape[1]
+			self._rows -= cells.shape[1]
+		emptied = np.unique(np.concatenate(touched))
+		emptied = emptied[self._counts[emptied] == 0]
+		for level in np.unique(self._keys[emptied, -2]).tolist():
+			known, known_cells = self._cells[level]
+			keep = ~np.isin(known_cells, emptied)
+			self._cells[level] = (known[keep], known_cells[keep])
+		# float sums of retracted values may leave rounding residue behind
+		self._sums[emptied] = 0.0
+		self._free.extend(emptied.tolist())
+		self.version += 1
+		return self
+
+	def clear(self):
+		self._cells = [self._no_cells() for _ in self._cells]
+		self._free.clear()
+		self._allocated = 0
+		self._counts[:] = 0
+		self._sums[:] = 0.0
+		self._log.clear()
+		self._rows = 0
+		self.version += 1
+
+	def query(self, by=(), start=None, end=None, resolution=None, where=None, distinct=(), means=()):
+		"""Measure sums and row counts grouped by the dimensions in `by`.
+
+		Pass "bucket" in `by` to group by bucket start time at `resolution`
+		(default: the finest); `start` / `end` limit the buckets to those
+		starting in [start, end]. Without either, the all-time cells are
+		read. `where` maps dimensions to a label or list of labels to keep.
+		Each dimension in `distinct` adds a column counting its distinct
+		labels per group (e.g. products per category), and measures named in
+		`means` come back as per-row means instead of sums. Rows with a
+		missing label in a grouped dimension are left out.
+		"""
+		by = (by,) if isinstance(by, str) else tuple(by)
+		distinct = (distinct,) if isinstance(distinct, str) else tuple(distinct)
+		means = (means,) if isinstance(means, str) else tuple(means)
+		if "bucket" in by or start is not None or end is not None:
+			level = self.resolutions.index(resolution or self.resolutions[0])
+			width = self._widths[level]
+		else:
+			level, width = len(self.resolutions), None
+		cells = self._cells[level][1]
+		keys = self._keys[cells]
+		mask = np.ones(len(cells), dtype=bool)
+		if start is not None:
+			mask &= keys[:, -1] >= (pd.Timestamp(start).value - BUCKET_ORIGIN.value) // width
+		if end is not None:
+			mask &= keys[:, -1] <= (pd.Timestamp(end).value - BUCKET_ORIGIN.value) // width
+		for name, labels in (where or {}).items():
+			labels = [labels] if isinstance(labels, str) or not np.iterable(labels) else labels
+			codes = self._labels[name]
+			mask &= np.isin(keys[:, self.dimensions.index(name)], [codes[label] for label in labels if label in codes])
+		columns = [-1 if name == "bucket" else self.dimensions.index(name) for name in by]
+		for column in columns:
+			mask &= keys[:, column] >= 0
+		cells, all_keys = cells[mask], keys[mask]
+		keys = all_keys[:, columns]
+		if by:
+			keys, groups = np.unique(keys, axis=0, return_inverse=True)
+			groups = groups.ravel()
+		else:
+			groups = np.zeros(len(cells), dtype=np.int64)
+		n_groups = len(keys) if by else 1
+		table = {}
+		for i, name in enumerate(by):
+			if name == "bucket":
+				table[name] = (BUCKET_ORIGIN.value + keys[:, i] * width).astype("datetime64[ns]")
+			else:
+				table[name] = pd.Categorical.from_codes(keys[:, i], categories=list(self._labels[name]))
+		rows = np.bincount(groups, weights=self._counts[cells], minlength=n_groups).astype(np.int64)
+		for i, name in enumerate(self.measures):
+			table[name] = np.bincount(groups, weights=self._sums[cells, i], minlength=n_groups)
+			if name in means:
+				with np.errstate(invalid="ignore", divide="ignore"):
+					table[name] = table[name] / rows
+		table["rows"] = rows
+		for name in distinct:
+			codes = all_keys[:, self.dimensions.index(name)]
+			present = np.unique(np.column_stack([groups, codes])[codes >= 0], axis=0)
+			table[name] = np.bincount(present[:, 0], minlength=n_groups)
+		return pd.DataFrame(table)
+
+
+def rollup_sales(df, dimensions=("product",), resolutions=("1D", "W"), time_column="date"):
+	"""Append-only sales / views / price cube of a load_data() frame (price is summed; query it with means="price")"""
+	cube = RollupCube(dimensions, SALES_MEASURES, bucket=resolutions, time_column=time_column, retractable=False)
+	return cube.update(df)
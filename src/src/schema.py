@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+WEEK_FREQ = "W"
+
+# Column types for sales frames, both loaded CSVs and real-time session history.
+# "week" is the pandas weekly period ordinal; see week_labels() for display strings.
+SALES_SCHEMA = {
+	"timestamp": "datetime64[ns]",
+	"date": "datetime64[ns]",
+	"week": "int32",
+	"product": "category",
+	"category": "category",
+	"sales": "int32",
+	"views": "int32",
+	# float64: float32 cannot hold cent prices exactly (149.99 reads back as 149.9900054932),
+	# and the error would reach revenue sums, JSON and exports
+	"price": "float64",
+}
+
+
+def schema_for(*columns):
+	"""Subset of SALES_SCHEMA, in the given column order"""
+	return {column: SALES_SCHEMA[column] for column in columns}
+
+
+def week_ordinal(dates):
+	"""Weekly period ordinals (int32) for a datetime Series"""
+	return dates.dt.to_period(WEEK_FREQ).array.asi8.astype(np.int32)
+
+
+def week_labels(ordinals):
+	"""'YYYY-MM-DD/YYYY-MM-DD' labels for week ordinals, as produced by to_period('W').astype(str)"""
+	return pd.PeriodIndex.from_ordinals(np.asarray(ordinals, dtype=np.int64), freq=WEEK_FREQ).astype(str)
+
+
+def week_start(ordinals):
+	return pd.PeriodIndex.from_ordinals(np.asarray(ordinals, dtype=np.int64), freq=WEEK_FREQ).start_time
+
+
+def with_week_labels(frame):
+	"""Copy of a frame with the week ordinal replaced by its display label, for tables and charts"""
+	if "week" not in frame.columns or not pd.api.types.is_integer_dtype(frame["week"]):
+		return frame
+	return frame.assign(week=week_labels(frame["week"]))
+
+
+def apply_schema(df, schema=SALES_SCHEMA, categorical=True):
+	"""Cast the schema columns present in `df` in place and return it.
+
+	Counts that do not fit the schema's integer type are kept wider instead
+	of wrapping around. With categorical=False label columns stay as-is,
+	for partial frames that are concatenated before being finalized.
+	"""
+	for column, dtype in schema.items():
+		if column not in df.columns:
+			continue
+		values = df[column]
+		if dtype == "category":
+			if categorical and not isinstance(values.dtype, pd.CategoricalDtype):
+				df[column] = values.astype("category")
+		elif dtype.startswith("datetime64"):
+			if values.dtype != dtype:
+				df[column] = pd.to_datetime(values)
+		elif dtype.startswith("int"):
+			if pd.api.types.is_integer_dtype(values) and values.dtype != dtype:
+				info = np.iinfo(dtype)
+				if len(values) == 0 or (values.min() >= info.min and values.max() <= info.max):
+					df[column] = values.astype(dtype)
+		elif values.dtype != dtype:
+			df[column] = values.astype(dtype)
+	return df
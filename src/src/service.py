@@ -0,0 +1,334 @@
+"""Headless analytics service: the trend pipeline over a local HTTP API.
+
+Keeps the configured sales CSVs and everything derived from them warm in
+one process, so tools and dashboard replicas can share it, e.g.:
+
+	python -m src.src.service --dataset sales=data/comprehensive_sales_data.csv --port 8765
+
+Routes (GET; tables as JSON records, or Arrow IPC with ?format=arrow):
+
+	/health
+	/metrics              (Prometheus text: per-stage latency percentiles)
+	/datasets
+	/datasets/<name>/weekly
+	/datasets/<name>/export/weekly.csv   (also .csv.gz, .parquet, .arrow)
+	/datasets/<name>/trending?k=10
+	/datasets/<name>/forecast?days=30&confidence=0.9
+	/datasets/<name>/trends?short_window=3&long_window=5
+	/datasets/<name>/changes          (EWMA crossover, CUSUM and seasonal z-score per product)
+	/datasets/<name>/products/<product>/series
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+
+from .data_cache import fingerprint, load_data_cached
+from .ecommerce_trends import compute_weekly, find_trending
+from .exports import EXPORT_FORMATS, available_formats, cached_export, iter_file
+from .forecasting import predict_sales_trends
+from .instrumentation import registry
+from .product_index import ProductIndex
+from .result_cache import cached_call, invalidate_results
+from .schema import with_week_labels
+from .trend_detectors import detect_changes
+from .trend_engine import detect_trends
+
+try:
+	import pyarrow as pa
+except ImportError:  # Arrow output is optional; JSON always works
+	pa = None
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_CONCURRENCY = 4
+MAX_HEADER_BYTES = 64 * 1024
+
+
+class HTTPError(Exception):
+	def __init__(self, status, message=None):
+		super().__init__(message or status.phrase)
+		self.status = status
+
+
+class Analytics:
+	"""Named sales datasets and their derived tables, shared through the result cache.
+
+	Every call re-checks the source fingerprint (a stat), so an edited CSV is
+	reloaded on the next request and results of the old version are dropped.
+	"""
+
+	def __init__(self, datasets):
+		self.datasets = {name: os.path.abspath(path) for name, path in datasets.items()}
+		self._versions = {}
+
+	def _source(self, name):
+		path = self.datasets.get(name)
+		if path is None:
+			raise HTTPError(HTTPStatus.NOT_FOUND, f"unknown dataset {name!r}")
+		version = fingerprint(path)
+		previous = self._versions.get(name)
+		if previous is not None and previous != version:
+			invalidate_results(previous)
+		self._versions[name] = version
+		return version, load_data_cached(path)
+
+	def weekly(self, name):
+		version, df = self._source(name)
+		return version, cached_call(compute_weekly, version, df)
+
+	def export(self, name, fmt):
+		version, weekly = self.weekly(name)
+		return cached_export(version, "weekly", lambda: with_week_labels(weekly), fmt)
+
+	def warm(self):
+		for name in self.datasets:
+			self.trending(name)
+			self.forecast(name)
+
+	def describe(self):
+		described = {}
+		for name, path in self.datasets.items():
+			_, weekly = self.weekly(name)
+			described[name] = {
+				"path": path,
+				"weekly_rows": len(weekly),
+				"products": int(weekly["product"].nunique()),
+				"weeks": int(weekly["week"].nunique()),
+			}
+		return described
+
+	def trending(self, name, k=10):
+		version, weekly = self.weekly(name)
+		return cached_call(find_trending, version, weekly, k=k)
+
+	def forecast(self, name, days=30, confidence=0.9):
+		version, weekly = self.weekly(name)
+		return cached_call(predict_sales_trends, version, weekly, days_to_predict=days, confidence=confidence)
+
+	def trends(self, name, short_window=3, long_window=5):
+		version, df = self._source(name)
+		history = cached_call(_as_history, version, df)
+		return cached_call(detect_trends, version, history, short_window=short_window, long_window=long_window)
+
+	def changes(self, name):
+		version, df = self._source(name)
+		history = cached_call(_as_history, version, df)
+		# daily sales rows, so weekday seasonality
+		return cached_call(detect_changes, version, history, season_period=7, season_bucket="1D")
+
+	def series(self, name, product):
+		version, weekly = self.weekly(name)
+		index = cached_call(ProductIndex, version, weekly, sort_by="week")
+		if product not in index:
+			raise HTTPError(HTTPStatus.NOT_FOUND, f"unknown product {product!r}")
+		return index.rows(product)
+
+
+def _as_history(df):
+	return df.rename(columns={"date": "timestamp"})
+
+
+def _json_default(value):
+	if isinstance(value, np.generic):
+		return value.item()
+	if isinstance(value, np.ndarray):
+		return value.tolist()
+	raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _json_float(value):
+	# json.dumps would write Infinity/NaN, which is not valid JSON
+	return value if np.isfinite(value) else None
+
+
+def _records(frame):
+	return json.loads(with_week_labels(frame).to_json(orient="records", date_format="iso"))
+
+
+def _table_body(frame, fmt):
+	frame = with_week_labels(frame)
+	if fmt == "arrow":
+		if pa is None:
+			raise HTTPError(HTTPStatus.NOT_ACCEPTABLE, "pyarrow is not installed")
+		table = pa.Table.from_pandas(frame, preserve_index=False)
+		sink = pa.BufferOutputStream()
+		with pa.ipc.new_stream(sink, table.schema) as writer:
+			writer.write_table(table)
+		return ARROW_MEDIA_TYPE, sink.getvalue().to_pybytes()
+	return "application/json", frame.to_json(orient="records", date_format="iso").encode()
+
+
+def _json_body(payload):
+	return "application/json", json.dumps(payload, default=_json_default).encode()
+
+
+def _param(query, name, cast, default):
+	values = query.get(name)
+	if not values:
+		return default
+	try:
+		return cast(values[-1])
+	except ValueError:
+		raise HTTPError(HTTPStatus.BAD_REQUEST, f"invalid {name}: {values[-1]!r}") from None
+
+
+def route(analytics, target):
+	"""(content type, body) for a request target, body being bytes or the path of a file to stream; raises HTTPError"""
+	url = urlsplit(target)
+	parts = [unquote(part) for part in url.path.strip("/").split("/") if part]
+	query = parse_qs(url.query)
+	fmt = _param(query, "format", str, "json")
+	if fmt not in ("json", "arrow"):
+		raise HTTPError(HTTPStatus.BAD_REQUEST, f"unknown format {fmt!r}")
+
+	if parts == ["health"]:
+		return _json_body({"status": "ok", "datasets": list(analytics.datasets)})
+	if parts == ["metrics"]:
+		return PROMETHEUS_MEDIA_TYPE, registry.prometheus_text().encode()
+	if parts == ["datasets"]:
+		return _json_body(analytics.describe())
+	if len(parts) < 3 or parts[0] != "datasets":
+		raise HTTPError(HTTPStatus.NOT_FOUND)
+	name, resource = parts[1], parts[2:]
+
+	if resource == ["weekly"]:
+		return _table_body(analytics.weekly(name)[1], fmt)
+	if len(resource) == 2 and resource[0] == "export":
+		table, _, export_format = resource[1].partition(".")
+		if table != "weekly" or export_format not in available_formats():
+			raise HTTPError(HTTPStatus.NOT_FOUND, f"no export {resource[1]!r}")
+		# a file path rather than bytes: handle() streams it from disk
+		return EXPORT_FORMATS[export_format][2], analytics.export(name, export_format)
+	if len(resource) == 3 and resource[0] == "products" and resource[2] == "series":
+		return _table_body(analytics.series(name, resource[1]), fmt)
+	if resource == ["trending"]:
+		rising, falling = analytics.trending(name, k=_param(query, "k", int, 10))
+		return _json_body({"rising": _records(rising), "falling": _records(falling)})
+	if resource == ["forecast"]:
+		days = _param(query, "days", int, 30)
+		confidence = _param(query, "confidence", float, 0.9)
+		if days <= 0 or not 0 < confidence < 1:
+			raise HTTPError(HTTPStatus.BAD_REQUEST, "days must be positive and 0 < confidence < 1")
+		forecasts = analytics.forecast(name, days=days, confidence=confidence)
+		return _json_body({
+			product: {key: [_json_float(v) for v in values] if isinstance(values, list) else values
+				for key, values in forecast.items()}
+			for product, forecast in forecasts.items()
+		})
+	if resource == ["changes"]:
+		return _table_body(analytics.changes(name), fmt)
+	if resource == ["trends"]:
+		trends = analytics.trends(name, short_window=_param(query, "short_window", int, 3),
+			long_window=_param(query, "long_window", int, 5))
+		return _json_body({
+			product: {key: _json_float(float(value)) if isinstance(value, (float, np.floating)) else value
+				for key, value in trend.items()}
+			for product, trend in trends.items()
+		})
+	raise HTTPError(HTTPStatus.NOT_FOUND)
+
+
+class AnalyticsServer:
+	"""Minimal asyncio HTTP/1.1 front end for `Analytics`.
+
+	Pandas work runs on a thread pool so the event loop keeps accepting
+	connections; at most `max_concurrency` requests compute at once and the
+	rest wait for a slot.
+	"""
+
+	def __init__(self, analytics, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+		self.analytics = analytics
+		self.max_concurrency = max_concurrency
+		self._executor = ThreadPoolExecutor(max_concurrency, thread_name_prefix="analytics")
+		self._slots = None
+
+	async def handle(self, reader, writer):
+		try:
+			head = await reader.readuntil(b"\r\n\r\n")
+		except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+			writer.close()
+			return
+		method = None
+		try:
+			method, target, _ = head.split(b"\r\n", 1)[0].decode("latin-1").split(" ", 2)
+			if method not in ("GET", "HEAD"):
+				raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+			async with self._slots:
+				loop = asyncio.get_running_loop()
+				content_type, body = await loop.run_in_executor(self._executor, route, self.analytics, target)
+			status = HTTPStatus.OK
+		except HTTPError as e:
+			status, (content_type, body) = e.status, _json_body({"error": str(e)})
+		except ValueError as e:
+			status, (content_type, body) = HTTPStatus.BAD_REQUEST, _json_body({"error": str(e)})
+		except Exception as e:
+			status = HTTPStatus.INTERNAL_SERVER_ERROR
+			content_type, body = _json_body({"error": f"{type(e).__name__}: {e}"})
+		try:
+			if isinstance(body, bytes):
+				length, chunks = len(body), [body]
+			else:
+				length, chunks = os.path.getsize(body), iter_file(body)
+			writer.write(
+				f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+				f"Content-Type: {content_type}\r\n"
+				f"Content-Length: {length}\r\n"
+				"Connection: close\r\n\r\n".encode("latin-1"))
+			if method != "HEAD":
+				for chunk in chunks:
+					writer.write(chunk)
+					await writer.drain()
+			await writer.drain()
+		finally:
+			writer.close()
+
+	async def serve(self, host="127.0.0.1", port=DEFAULT_PORT, ready=None):
+		self._slots = asyncio.Semaphore(self.max_concurrency)
+		server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+		if ready is not None:
+			ready(server)
+		async with server:
+			await server.serve_forever()
+
+
+def _dataset_arg(value):
+	name, sep, path = value.partition("=")
+	if not sep:
+		name, path = os.path.splitext(os.path.basename(value))[0], value
+	return name, path
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--dataset", type=_dataset_arg, action="append", metavar="[NAME=]PATH",
+		help="sales CSV to serve (repeatable); default: data/comprehensive_sales_data.csv")
+	parser.add_argument("--host", default="127.0.0.1")
+	parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+	parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+		help="requests computed at once; further requests wait")
+	parser.add_argument("--no-warm", action="store_true", help="skip precomputing on start-up")
+	args = parser.parse_args(argv)
+
+	root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+	datasets = dict(args.dataset or [("sales", os.path.join(root, "data", "comprehensive_sales_data.csv"))])
+	analytics = Analytics(datasets)
+	if not args.no_warm:
+		analytics.warm()
+	server = AnalyticsServer(analytics, args.max_concurrency)
+	print(f"Serving {', '.join(datasets)} on http://{args.host}:{args.port}", file=sys.stderr)
+	try:
+		asyncio.run(server.serve(args.host, args.port))
+	except KeyboardInterrupt:
+		pass
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+DEFAULT_CATEGORIES = ("Electronics", "Computers", "Home & Kitchen", "Fashion")
+TREND_PRICE_POINTS = (199, 299, 399, 499, 699, 899, 1099, 1299)
+
+
+def make_catalog(n_products, categories=DEFAULT_CATEGORIES):
+	"""Synthetic {category: [product, ...]} catalog of `n_products` SKUs for load tests"""
+	catalog = {category: [] for category in categories}
+	for i in range(n_products):
+		category = categories[i % len(categories)]
+		catalog[category].append(f"{category} SKU {i:06d}")
+	return catalog
+
+
+def catalog_arrays(catalog):
+	"""Flatten a {category: [products]} catalog into aligned product/category arrays"""
+	products = [product for items in catalog.values() for product in items]
+	categories = [category for category, items in catalog.items() for _ in items]
+	return np.array(products, dtype=object), np.array(categories, dtype=object)
+
+
+def _timestamps(n_ticks, n_products, end, interval):
+	end = np.datetime64(end or datetime.now(), "ns")
+	step = np.timedelta64(int(interval.total_seconds() * 1e9), "ns")
+	ticks = end - step * np.arange(n_ticks - 1, -1, -1)
+	return np.repeat(ticks, n_products)
+
+
+def generate_trend_ticks(catalog, n_ticks=1, trending_products=None, rng=None,
+		end=None, interval=timedelta(seconds=1), price_points=TREND_PRICE_POINTS):
+	"""Vectorized ticks for every catalog product, with multiplicative sales uplift
+	for `trending_products` ({product: factor}). Returns a dict of column arrays,
+	tick-major, with the last tick stamped `end` (default: now).
+	"""
+	rng = np.random.default_rng(rng)
+	products, categories = catalog_arrays(catalog)
+	trending_products = trending_products or {}
+	trend = np.array([trending_products.get(p, 1.0) for p in products])
+	shape = (n_ticks, len(products))
+
+	base_sales = rng.integers(5, 30, shape)
+	base_views = (base_sales * rng.uniform(8, 20, shape)).astype(np.int64)
+	base_price = rng.choice(np.asarray(price_points, dtype=np.float64), shape)
+
+	sales = (base_sales * trend * (0.8 + rng.random(shape) * 0.4)).astype(np.int64)
+	views = (base_views * (0.9 + rng.random(shape) * 0.2)).astype(np.int64)
+	price = base_price * (0.95 + rng.random(shape) * 0.1)
+
+	return {
+		'timestamp': _timestamps(n_ticks, len(products), end, interval),
+		'product': np.tile(products, n_ticks),
+		'category': np.tile(categories, n_ticks),
+		'sales': np.maximum(1, sales).ravel(),
+		'views': np.maximum(views, sales * 5).ravel(),
+		'price': np.round(price, 2).ravel()
+	}
+
+
+def generate_real_time_ticks(products, n_ticks=1, rng=None, end=None, interval=timedelta(seconds=1),
+		sales_range=(1, 50), base_sales=None, min_sales=0, views_per_sale=(5, 15),
+		price_points=None, price_jitter=0.1):
+	"""Vectorized fluctuating ticks for a product list.
+
+	Sales are drawn uniformly from `sales_range`, or, when `base_sales` (one
+	value per product) is given, as base_sales * U(0.8, 1.2). Views scale
+	sales by U(*views_per_sale). A price column is only produced when
+	`price_points` is given, jittered by +/- `price_jitter / 2`.
+	"""
+	rng = np.random.default_rng(rng)
+	products = np.asarray(products, dtype=object)
+	shape = (n_ticks, len(products))
+
+	if base_sales is None:
+		sales = rng.integers(sales_range[0], sales_range[1], shape)
+	else:
+		sales = (np.asarray(base_sales, dtype=np.float64) * rng.uniform(0.8, 1.2, shape)).astype(np.int64)
+	sales = np.maximum(min_sales, sales)
+	views = (sales * rng.uniform(views_per_sale[0], views_per_sale[1], shape)).astype(np.int64)
+
+	ticks = {
+		'timestamp': _timestamps(n_ticks, len(products), end, interval),
+		'product': np.tile(products, n_ticks),
+		'sales': sales.ravel(),
+		'views': views.ravel()
+	}
+	if price_points is not None:
+		base_price = rng.choice(np.asarray(price_points, dtype=np.float64), shape)
+		price = base_price * (1 - price_jitter / 2 + rng.random(shape) * price_jitter)
+		ticks['price'] = np.round(price, 2).ravel()
+	return ticks
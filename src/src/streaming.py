@@ -0,0 +1,330 @@
+import csv
+import json
+import os
+import queue
+import selectors
+import socket
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_BATCH_ROWS = 5_000
+DEFAULT_LINGER = 0.25
+DEFAULT_MAX_BATCHES = 64
+POLL_INTERVAL = 0.1
+
+
+def records_to_batch(records, columns):
+	"""Columnar batch for RingBuffer.append() from event dicts.
+
+	Missing timestamps default to now, other missing values to 0 (numbers)
+	or None (labels); fields outside `columns` are ignored. Records whose
+	timestamp is present but unparseable are dropped, so the batch may be
+	shorter than `records`.
+	"""
+	batch = {}
+	keep = np.ones(len(records), dtype=bool)
+	for name, dtype in columns.items():
+		values = [record.get(name) for record in records]
+		if str(dtype).startswith("datetime64"):
+			now = np.datetime64(datetime.now(), "ns")
+			raw = pd.Series([None if v == "" else v for v in values], dtype=object)
+			# naive and tz-aware stamps may be mixed; all end up naive UTC
+			stamps = pd.to_datetime(raw, format="mixed", errors="coerce", utc=True)
+			stamps = stamps.dt.tz_convert(None).to_numpy()
+			missing = raw.isna().to_numpy()
+			keep &= missing | ~pd.isna(stamps)
+			batch[name] = np.where(missing, now, stamps)
+		elif dtype == "category":
+			batch[name] = np.array([None if v is None else str(v) for v in values], dtype=object)
+		else:
+			batch[name] = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").fillna(0).to_numpy()
+	if not keep.all():
+		batch = {name: values[keep] for name, values in batch.items()}
+	return batch
+
+
+def concat_batches(batches):
+	return {name: np.concatenate([batch[name] for batch in batches]) for name in batches[0]}
+
+
+class SimulatorSource:
+	"""Source backed by a tick generator such as simulator.generate_real_time_ticks"""
+
+	# same status attributes as QueueSource; generator errors surface through the Ticker
+	error = None
+	bad_records = 0
+
+	def __init__(self, generate):
+		self.generate = generate
+
+	def start(self):
+		return self
+
+	def stop(self):
+		pass
+
+	def poll(self):
+		return self.generate()
+
+
+class QueueSource:
+	"""Base for sources whose reader thread feeds micro-batches to poll() through a bounded queue.
+
+	The reader groups records into batches of up to `batch_rows`, flushing a
+	partial batch once its oldest record is `linger` seconds old. When
+	`max_batches` batches are waiting the reader blocks instead of dropping
+	data, which in turn stops it reading its file or socket (backpressure).
+	Subclasses implement `_records()`, a generator of event dicts that yields
+	None whenever it is idle.
+	"""
+
+	def __init__(self, columns, batch_rows=DEFAULT_BATCH_ROWS, linger=DEFAULT_LINGER,
+			max_batches=DEFAULT_MAX_BATCHES):
+		self.columns = columns
+		self.batch_rows = batch_rows
+		self.linger = linger
+		self.rows_in = 0
+		self.bad_records = 0
+		self.error = None
+		self._queue = queue.Queue(max_batches)
+		self._stopped = threading.Event()
+		self._thread = None
+
+	@property
+	def pending_batches(self):
+		return self._queue.qsize()
+
+	def start(self):
+		if self._thread is None:
+			self._stopped.clear()
+			self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+			self._thread.start()
+		return self
+
+	def stop(self, timeout=None):
+		self._stopped.set()
+		if self._thread is not None:
+			self._thread.join(timeout)
+			self._thread = None
+
+	def poll(self):
+		"""Everything queued so far as one batch, or None if nothing arrived"""
+		batches = []
+		while True:
+			try:
+				batches.append(self._queue.get_nowait())
+			except queue.Empty:
+				break
+		return concat_batches(batches) if batches else None
+
+	def _run(self):
+		pending, deadline = [], None
+		try:
+			for record in self._records():
+				if record is not None:
+					pending.append(record)
+					deadline = deadline or time.monotonic() + self.linger
+				if pending and (len(pending) >= self.batch_rows or time.monotonic() >= deadline):
+					if not self._flush(pending):
+						return
+					pending, deadline = [], None
+				if self._stopped.is_set():
+					return
+		except Exception as e:
+			self.error = e
+
+	def _flush(self, records):
+		"""Convert and queue one micro-batch; bad fields cost their records, never the reader"""
+		try:
+			batch = records_to_batch(records, self.columns)
+		except (TypeError, ValueError):
+			self.bad_records += len(records)
+			return True
+		rows = len(next(iter(batch.values()))) if batch else len(records)
+		self.bad_records += len(records) - rows
+		if not rows:
+			return True
+		if not self._put(batch):
+			return False
+		self.rows_in += rows
+		return True
+
+	def _put(self, batch):
+		while not self._stopped.is_set():
+			try:
+				self._queue.put(batch, timeout=POLL_INTERVAL)
+				return True
+			except queue.Full:
+				continue
+		return False
+
+	def _parse(self, line, fieldnames=None):
+		"""Event dict from one JSON or CSV line; None (and counted) if malformed"""
+		try:
+			if fieldnames is None:
+				record = json.loads(line)
+				if isinstance(record, dict):
+					return record
+			else:
+				values = next(csv.reader([line]))
+				if len(values) == len(fieldnames):
+					return dict(zip(fieldnames, values))
+		except (ValueError, StopIteration):
+			pass
+		self.bad_records += 1
+		return None
+
+	def _records(self):
+		raise NotImplementedError
+
+
+class FileTailSource(QueueSource):
+	"""Follows an append-only CSV (with header) or JSON-lines file, like `tail -f`.
+
+	Waits for the file to appear, only consumes complete lines, and starts
+	over if the file is truncated or replaced. With from_start=False only
+	lines appended after start() are read.
+	"""
+
+	def __init__(self, path, columns, fmt=None, from_start=True, **kwargs):
+		super().__init__(columns, **kwargs)
+		self.path = os.fspath(path)
+		self.fmt = fmt or ("csv" if self.path.endswith(".csv") else "jsonl")
+		self.from_start = from_start
+
+	def _records(self):
+		skip_existing = not self.from_start
+		while not self._stopped.is_set():
+			try:
+				f = open(self.path, newline="", encoding="utf-8")
+			except FileNotFoundError:
+				yield None
+				time.sleep(POLL_INTERVAL)
+				continue
+			with f:
+				inode = os.fstat(f.fileno()).st_ino
+				fieldnames = None
+				if self.fmt == "csv":
+					header = f.readline()
+					while not header.endswith("\n") and not self._stopped.is_set():
+						yield None
+						time.sleep(POLL_INTERVAL)
+						header += f.readline()
+					fieldnames = next(csv.reader([header]))
+				if skip_existing:
+					f.seek(0, os.SEEK_END)
+					skip_existing = False
+				partial = ""
+				while not self._stopped.is_set():
+					line = f.readline()
+					if line.endswith("\n"):
+						line, partial = partial + line, ""
+						if line.strip():
+							yield self._parse(line, fieldnames)
+						continue
+					partial += line
+					try:
+						st = os.stat(self.path)
+					except FileNotFoundError:
+						st = None
+					if st is None or st.st_ino != inode or st.st_size < f.tell():
+						break  # rotated or truncated: reopen from the start
+					yield None
+					time.sleep(POLL_INTERVAL)
+
+
+class SocketSource(QueueSource):
+	"""Line-protocol listener on TCP (`address=(host, port)`) or a Unix socket (`address=path`).
+
+	Each client sends newline-terminated JSON objects, or CSV rows after a
+	header line when fmt="csv". Several clients may be connected at once.
+	"""
+
+	def __init__(self, address, columns, fmt="jsonl", **kwargs):
+		super().__init__(columns, **kwargs)
+		self.fmt = fmt
+		if isinstance(address, (str, os.PathLike)):
+			address = os.fspath(address)
+			if os.path.exists(address):
+				os.unlink(address)
+			self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		else:
+			self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+			self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+		self._server.bind(address)
+		self._server.listen()
+		self._server.setblocking(False)
+		self.address = self._server.getsockname()
+
+	def stop(self, timeout=None):
+		super().stop(timeout)
+		self._server.close()
+		if isinstance(self.address, str) and os.path.exists(self.address):
+			os.unlink(self.address)
+
+	def _records(self):
+		selector = selectors.DefaultSelector()
+		selector.register(self._server, selectors.EVENT_READ)
+		# per connection: [unterminated tail, CSV fieldnames or None]
+		clients = {}
+		try:
+			while not self._stopped.is_set():
+				events = selector.select(POLL_INTERVAL)
+				if not events:
+					yield None
+				for key, _ in events:
+					if key.fileobj is self._server:
+						conn, _ = self._server.accept()
+						conn.setblocking(False)
+						selector.register(conn, selectors.EVENT_READ)
+						clients[conn] = [b"", None]
+						continue
+					conn = key.fileobj
+					try:
+						data = conn.recv(65536)
+					except BlockingIOError:
+						continue
+					except OSError:
+						# a reset client only loses its own connection (and its unterminated line)
+						selector.unregister(conn)
+						conn.close()
+						del clients[conn]
+						continue
+					state = clients[conn]
+					if not data:
+						selector.unregister(conn)
+						conn.close()
+						del clients[conn]
+						data = b"\n" if state[0] else b""
+					*lines, state[0] = (state[0] + data).split(b"\n")
+					for raw in lines:
+						line = raw.decode("utf-8", "replace").strip()
+						if not line:
+							continue
+						if self.fmt == "csv" and state[1] is None:
+							state[1] = next(csv.reader([line]))
+							continue
+						yield self._parse(line, state[1])
+		finally:
+			for conn in clients:
+				conn.close()
+			selector.close()
+
+
+def source_from_spec(spec, columns, simulate, **kwargs):
+	"""Source for a LIVE_SOURCE-style spec: tail:<path>, tcp:<host>:<port>, unix:<path>, or simulator (default)"""
+	kind, _, target = (spec or "simulator").partition(":")
+	if kind == "simulator":
+		return SimulatorSource(simulate)
+	if kind == "tail":
+		return FileTailSource(target, columns, **kwargs)
+	if kind == "tcp":
+		host, _, port = target.rpartition(":")
+		return SocketSource((host or "127.0.0.1", int(port)), columns, **kwargs)
+	if kind == "unix":
+		return SocketSource(target, columns, **kwargs)
+	raise ValueError(f"unknown live source {spec!r}")
@@ -0,0 +1,112 @@
+import threading
+import time
+from datetime import datetime
+
+from .instrumentation import timed
+
+
+class Ticker:
+	"""Background producer that appends a batch from `produce()` to a shared RingBuffer every `interval` seconds.
+
+	One ticker serves every session of a dashboard (keep it in
+	st.cache_resource), so a tick is generated once rather than once per
+	session rerun, and on the configured schedule rather than whenever a
+	session happens to run. Sessions read through `frame()`, which is built
+	once per buffer version, or hold `lock` while reading the buffer or any
+	state that `on_tick(batch)` maintains alongside it.
+	"""
+
+	def __init__(self, produce, buffer, interval, on_tick=None):
+		self.produce = produce
+		self.buffer = buffer
+		self.on_tick = on_tick
+		self.lock = threading.RLock()
+		self.last_update = None
+		self.error = None
+		self._interval = float(interval)
+		self._last_tick = None
+		self._frame = None
+		self._frame_version = None
+		self._wake = threading.Event()
+		self._stopped = threading.Event()
+		self._thread = None
+
+	@property
+	def interval(self):
+		return self._interval
+
+	@interval.setter
+	def interval(self, seconds):
+		seconds = float(seconds)
+		if seconds <= 0:
+			raise ValueError("interval must be positive")
+		if seconds != self._interval:
+			self._interval = seconds
+			self._wake.set()  # reschedule the pending tick
+
+	@property
+	def running(self):
+		return self._thread is not None and self._thread.is_alive()
+
+	@property
+	def version(self):
+		return self.buffer.version
+
+	def start(self):
+		"""Produce the first tick now, then keep ticking on a daemon thread"""
+		if self.running:
+			return self
+		self.tick()
+		self._stopped.clear()
+		self._thread = threading.Thread(target=self._run, name="ticker", daemon=True)
+		self._thread.start()
+		return self
+
+	def stop(self, timeout=None):
+		self._stopped.set()
+		self._wake.set()
+		if self._thread is not None:
+			self._thread.join(timeout)
+			self._thread = None
+
+	def tick(self):
+		"""Produce and append one batch right away; the schedule restarts from here.
+
+		produce() may return None when there is nothing new (e.g. an idle stream).
+		"""
+		with timed("ticker.produce"):
+			batch = self.produce()
+		if batch is None:
+			self._last_tick = time.monotonic()
+			return None
+		with self.lock, timed("ticker.append"):
+			self.buffer.append(batch)
+			if self.on_tick is not None:
+				self.on_tick(batch)
+			self.last_update = datetime.now()
+			self._last_tick = time.monotonic()
+		return batch
+
+	def frame(self):
+		"""Buffer contents as a DataFrame, shared by all readers until the next tick"""
+		with self.lock:
+			if self._frame_version != self.buffer.version:
+				with timed("ticker.frame"):
+					self._frame = self.buffer.to_frame()
+				self._frame_version = self.buffer.version
+			return self._frame
+
+	def _run(self):
+		while not self._stopped.is_set():
+			delay = self._last_tick + self._interval - time.monotonic()
+			if delay > 0:
+				self._wake.wait(delay)
+				self._wake.clear()
+				continue
+			try:
+				self.tick()
+				self.error = None
+			except Exception as e:
+				# keep the feed alive; readers can surface the last failure
+				self.error = e
+				self._last_tick = time.monotonic()
@@ -0,0 +1,270 @@
+import numpy as np
+import pandas as pd
+
+from .instrumentation import timed
+from .rollup_cube import BUCKET_ORIGIN
+
+# per-product float state; float32 halves the footprint of 100k-product catalogs
+STATE_DTYPE = "float32"
+# sales are unit counts, so residuals smaller than one unit are treated as noise
+MIN_STD = 1.0
+
+DETECTOR_COLUMNS = [
+	"product", "observations", "value", "fast", "slow", "crossover", "cross", "since_cross",
+	"z", "cusum_up", "cusum_down", "change", "since_change", "changes", "seasonal_z",
+]
+
+
+class TrendDetectors:
+	"""EWMA crossover, CUSUM change-point and seasonally adjusted z-score for every product.
+
+	Each product owns one slot of a few flat state arrays (and one row of
+	the per-season arrays), so an observation costs O(1) and a batch of
+	ticks is a handful of vectorized numpy operations however large the
+	catalog is:
+
+	- crossover: fast and slow EWMAs of the value; `crossover` is their
+	  relative gap (like TrendEngine's trend_score) and `cross` the side
+	  the fast one is on, with `since_cross` observations since it changed.
+	- CUSUM: two-sided cumulative sums of the z-score of each value against
+	  the slow EWMA and its EWM variance, less the allowance `cusum_k`. A
+	  sum above `cusum_h` raises a change (+1 up, -1 down) and restarts both.
+	- seasonal z-score: observations are summed per `season_bucket` (by
+	  default per hour), and each completed bucket's mean value is folded
+	  once into an EWM mean and variance for its phase (the hour of day).
+	  The running mean of the current bucket is scored against them, so
+	  this hour is compared with the same hour on earlier days, however
+	  many ticks fall into an hour.
+
+	Scores are 0 until a product has `warmup` observations, or for the
+	seasonal score `season_warmup` completed buckets in the phase. Without
+	timestamps every observation is its own bucket and the phase is the
+	observation number modulo `season_period`.
+	"""
+
+	def __init__(self, fast_span=3, slow_span=12, cusum_k=0.5, cusum_h=5.0, season_period=24,
+			season_bucket="1h", season_span=7, warmup=5, season_warmup=3, min_std=MIN_STD, dtype=STATE_DTYPE, capacity=1024):
+		if not 0 < fast_span < slow_span:
+			raise ValueError("need 0 < fast_span < slow_span")
+		self.fast_alpha = 2.0 / (fast_span + 1)
+		self.slow_alpha = 2.0 / (slow_span + 1)
+		self.season_alpha = 2.0 / (season_span + 1)
+		self.cusum_k = cusum_k
+		self.cusum_h = cusum_h
+		self.season_period = season_period
+		self.season_bucket = pd.Timedelta(season_bucket)
+		self.warmup = warmup
+		self.season_warmup = season_warmup
+		self.min_std = min_std
+		self.dtype = np.dtype(dtype)
+		self._products = pd.Index([], dtype=object)
+		self._count = np.zeros(capacity, dtype=np.int64)
+		# last observation number at which the fast EWMA crossed the slow one / CUSUM fired
+		self._crossed_at = np.zeros(capacity, dtype=np.int64)
+		self._changed_at = np.zeros(capacity, dtype=np.int64)
+		self._changes = np.zeros(capacity, dtype=np.int32)
+		self._cross = np.zeros(capacity, dtype=np.int8)
+		self._change = np.zeros(capacity, dtype=np.int8)
+		# value, fast, slow, variance, cusum up, cusum down, z, seasonal z
+		self._state = np.zeros((8, capacity), dtype=self.dtype)
+		self._season = np.zeros((2, capacity, season_period), dtype=self.dtype)
+		self._season_count = np.zeros((capacity, season_period), dtype=np.int32)
+		# the bucket each product is currently summing, with its running sum and observation count
+		self._bucket = np.zeros(capacity, dtype=np.int64)
+		self._bucket_sum = np.zeros(capacity, dtype=np.float64)
+		self._bucket_n = np.zeros(capacity, dtype=np.int32)
+
+	def __len__(self):
+		return len(self._products)
+
+	@property
+	def nbytes(self):
+		return sum(array.nbytes for array in (
+			self._count, self._crossed_at, self._changed_at, self._changes, self._cross, self._change,
+			self._state, self._season, self._season_count, self._bucket, self._bucket_sum, self._bucket_n))
+
+	def _rows(self, products):
+		products = np.asarray(products, dtype=object)
+		# a hash lookup against the known products; only unseen labels are factorized
+		rows = self._products.get_indexer(products)
+		new = rows < 0
+		if new.any():
+			codes, uniques = pd.factorize(products[new], use_na_sentinel=False)
+			rows[new] = len(self._products) + codes
+			self._products = self._products.append(pd.Index(uniques, dtype=object))
+			if len(self._products) > len(self._count):
+				self._grow(len(self._products))
+		return rows, np.bincount(rows).max() > 1
+
+	def _grow(self, needed):
+		size = max(needed, 2 * len(self._count))
+
+		def grown(array, axis=-1):
+			shape = list(array.shape)
+			shape[axis] = size - shape[axis]
+			return np.concatenate([array, np.zeros(shape, dtype=array.dtype)], axis=axis)
+
+		self._count = grown(self._count)
+		self._crossed_at = grown(self._crossed_at)
+		self._changed_at = grown(self._changed_at)
+		self._changes = grown(self._changes)
+		self._cross = grown(self._cross)
+		self._change = grown(self._change)
+		self._state = grown(self._state)
+		self._season = grown(self._season, axis=1)
+		self._season_count = grown(self._season_count, axis=0)
+		self._bucket = grown(self._bucket)
+		self._bucket_sum = grown(self._bucket_sum)
+		self._bucket_n = grown(self._bucket_n)
+
+	def _buckets(self, timestamps):
+		if timestamps is None:
+			return None
+		offsets = np.atleast_1d(np.asarray(timestamps)).astype("datetime64[ns]").view(np.int64) - BUCKET_ORIGIN.value
+		return offsets // self.season_bucket.value
+
+	def observe(self, products, values, timestamps=None):
+		"""Feed one batch of (product, value[, timestamp]) observations, oldest first.
+
+		A product may appear more than once in a batch; its values are then
+		applied in batch order.
+		"""
+		values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+		if len(values) == 0:
+			return self
+		rows, repeated = self._rows(products)
+		buckets = self._buckets(timestamps)
+		if not repeated:
+			self._update(rows, values, buckets)
+			return self
+		# rank of each row among the rows of the same product, in batch order
+		order = np.argsort(rows, kind="stable")
+		sorted_rows = rows[order]
+		starts = np.flatnonzero(np.r_[True, sorted_rows[1:] != sorted_rows[:-1]])
+		rank = np.empty(len(rows), dtype=np.int64)
+		rank[order] = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+		# each round touches every product at most once, so it can be vectorized
+		order = np.argsort(rank, kind="stable")
+		bounds = np.searchsorted(rank[order], np.arange(int(rank.max()) + 2))
+		for lo, hi in zip(bounds[:-1], bounds[1:]):
+			batch = order[lo:hi]
+			self._update(rows[batch], values[batch], None if buckets is None else buckets[batch])
+		return self
+
+	def _update(self, rows, x, buckets):
+		count = self._count[rows]
+		first = count == 0
+		warm = count >= self.warmup
+		_, fast, slow, var, up, down, _, _ = self._state[:, rows].astype(np.float64)
+
+		# z-score of the value against the slow EWMA before it absorbs the value
+		residual = x - slow
+		z = np.where(warm, residual / np.maximum(np.sqrt(var), self.min_std), 0.0)
+		fast = np.where(first, x, fast + self.fast_alpha * (x - fast))
+		slow = np.where(first, x, slow + self.slow_alpha * residual)
+		var = np.where(first, 0.0, (1 - self.slow_alpha) * (var + self.slow_alpha * residual ** 2))
+
+		up = np.maximum(up + z - self.cusum_k, 0.0)
+		down = np.maximum(down - z - self.cusum_k, 0.0)
+		change = np.where(up > self.cusum_h, 1, np.where(down > self.cusum_h, -1, 0))
+		fired = change != 0
+		up[fired] = down[fired] = 0.0
+		fired_rows = rows[fired]
+		self._change[fired_rows] = change[fired]
+		self._changed_at[fired_rows] = count[fired] + 1
+		self._changes[fired_rows] += 1
+
+		cross = np.sign(fast - slow).astype(np.int8)
+		crossed = warm & (cross != 0) & (cross != self._cross[rows])
+		self._crossed_at[rows[crossed]] = count[crossed] + 1
+		self._cross[rows] = np.where(cross != 0, cross, self._cross[rows])
+
+		# without timestamps every observation is a bucket of its own
+		seasonal_z = self._seasonal(rows, x, count if buckets is None else buckets)
+
+		self._state[:, rows] = (x, fast, slow, var, up, down, z, seasonal_z)
+		self._count[rows] = count + 1
+
+	def _seasonal(self, rows, x, buckets):
+		period = self.season_period
+		current = self._bucket[rows]
+		n = self._bucket_n[rows]
+		closed = (n > 0) & (buckets != current)
+		if closed.any():
+			closed_rows = rows[closed]
+			self._fold(closed_rows * period + current[closed] % period, self._bucket_sum[closed_rows] / n[closed])
+		started = (n == 0) | closed
+		total = np.where(started, x, self._bucket_sum[rows] + x)
+		n = np.where(started, 1, n + 1)
+		self._bucket[rows] = buckets
+		self._bucket_sum[rows] = total
+		self._bucket_n[rows] = n
+		# flat positions in the (products x phases) arrays, cheaper than 2-d fancy indexing
+		cells = rows * period + buckets % period
+		mean, var = self._season.reshape(2, -1)[:, cells].astype(np.float64)
+		return np.where(self._season_count.reshape(-1)[cells] >= self.season_warmup,
+			(total / n - mean) / np.maximum(np.sqrt(var), self.min_std), 0.0)
+
+	def _fold(self, cells, values):
+		"""Fold the mean value of one completed bucket per cell into its phase's EWM mean and variance"""
+		season = self._season.reshape(2, -1)
+		season_counts = self._season_count.reshape(-1)
+		count = season_counts[cells]
+		mean, var = season[:, cells].astype(np.float64)
+		deviation = values - mean
+		first = count == 0
+		season[:, cells] = (
+			np.where(first, values, mean + self.season_alpha * deviation),
+			np.where(first, 0.0, (1 - self.season_alpha) * (var + self.season_alpha * deviation ** 2)),
+		)
+		season_counts[cells] = count + 1
+
+	def _table(self, rows):
+		value, fast, slow, _, up, down, z, seasonal_z = self._state[:, rows].astype(np.float64)
+		count = self._count[rows]
+		with np.errstate(divide="ignore", invalid="ignore"):
+			crossover = np.where(slow > 0, (fast - slow) / slow, 0.0)
+		return pd.DataFrame({
+			"product": self._products[rows],
+			"observations": count,
+			"value": value,
+			"fast": fast,
+			"slow": slow,
+			"crossover": crossover,
+			"cross": self._cross[rows],
+			"since_cross": np.where(self._crossed_at[rows] > 0, count - self._crossed_at[rows], -1),
+			"z": z,
+			"cusum_up": up,
+			"cusum_down": down,
+			"change": self._change[rows],
+			"since_change": np.where(self._changed_at[rows] > 0, count - self._changed_at[rows], -1),
+			"changes": self._changes[rows],
+			"seasonal_z": seasonal_z,
+		}, columns=DETECTOR_COLUMNS)
+
+	def frame(self):
+		"""Current scores of every product (since_* are -1 where nothing happened yet)"""
+		return self._table(np.arange(len(self._products)))
+
+	def alerts(self, within=1, z_threshold=3.0):
+		"""Products whose CUSUM fired or EWMAs crossed in their last `within` observations, or with |seasonal z| >= z_threshold.
+
+		Only the flagged slots are turned into a table, so this stays cheap on large catalogs.
+		"""
+		n = len(self._products)
+		count = self._count[:n]
+		recent_change = (self._changed_at[:n] > 0) & (count - self._changed_at[:n] < within)
+		recent_cross = (self._crossed_at[:n] > 0) & (count - self._crossed_at[:n] < within)
+		unusual = np.abs(self._state[7, :n]) >= z_threshold
+		table = self._table(np.flatnonzero(recent_change | recent_cross | unusual))
+		order = np.argsort(-np.abs(table["seasonal_z"].to_numpy()), kind="stable")
+		return table.iloc[order].reset_index(drop=True)
+
+
+@timed("detect_changes")
+def detect_changes(data, value="sales", **params):
+	"""Replay a history frame with timestamp/product/<value> columns through TrendDetectors; returns its frame()"""
+	detectors = TrendDetectors(**params)
+	history = data.sort_values("timestamp", kind="stable")
+	detectors.observe(history["product"].to_numpy(), history[value].to_numpy(), history["timestamp"].to_numpy())
+	return detectors.frame()
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+from .instrumentation import timed
+
+
+def classify_trend(trend_score):
+	"""Map a moving-average trend score to the (status, css class) shown on product cards"""
+	if trend_score > 0.2:
+		return "🚀 Rapid Growth", "trend-up"
+	if trend_score > 0.05:
+		return "📈 Growing", "trend-up"
+	if trend_score < -0.2:
+		return "📉 Rapid Decline", "trend-down"
+	if trend_score < -0.05:
+		return "🔻 Declining", "trend-down"
+	return "➡️ Stable", "trend-neutral"
+
+
+class TrendEngine:
+	"""Per-product short/long moving averages maintained in O(1) per observation.
+
+	Each product owns one row of a (products x long_window) circular window
+	plus running window sums, so a new sales value only touches its own
+	row. `trends()` reports the same fields as the original detect_trends()
+	for every product with at least `long_window` observations. With an
+	integer dtype the running sums are exact and the results are identical
+	to recomputing the means from the full history.
+	"""
+
+	def __init__(self, short_window=3, long_window=5, dtype="int64", capacity=64):
+		if not 0 < short_window <= long_window:
+			raise ValueError("need 0 < short_window <= long_window")
+		self.short_window = short_window
+		self.long_window = long_window
+		self.dtype = np.dtype(dtype)
+		self._index = {}
+		self._products = []
+		self._window = np.zeros((capacity, long_window), dtype=self.dtype)
+		self._short_sum = np.zeros(capacity, dtype=self.dtype)
+		self._long_sum = np.zeros(capacity, dtype=self.dtype)
+		self._count = np.zeros(capacity, dtype=np.int64)
+
+	def __len__(self):
+		return len(self._products)
+
+	def _rows(self, products):
+		rows = np.empty(len(products), dtype=np.int64)
+		for i, product in enumerate(products):
+			row = self._index.get(product)
+			if row is None:
+				row = self._index[product] = len(self._products)
+				self._products.append(product)
+			rows[i] = row
+		if len(self._products) > len(self._count):
+			self._grow(len(self._products))
+		return rows
+
+	def _grow(self, needed):
+		size = max(needed, 2 * len(self._count))
+		extra = size - len(self._count)
+		self._window = np.vstack([self._window, np.zeros((extra, self.long_window), dtype=self.dtype)])
+		self._short_sum = np.concatenate([self._short_sum, np.zeros(extra, dtype=self.dtype)])
+		self._long_sum = np.concatenate([self._long_sum, np.zeros(extra, dtype=self.dtype)])
+		self._count = np.concatenate([self._count, np.zeros(extra, dtype=np.int64)])
+
+	def observe(self, products, sales):
+		"""Feed one batch of (product, sales) observations, oldest first.
+
+		A product may appear more than once in a batch; its values are then
+		applied in batch order.
+		"""
+		products = np.asarray(products, dtype=object)
+		sales = np.asarray(sales).astype(self.dtype, copy=False)
+		if len(products) == 0:
+			return self
+		rows = self._rows(products)
+		rank = pd.Series(rows).groupby(rows).cumcount().to_numpy()
+		for r in range(int(rank.max()) + 1):
+			# each round touches every product at most once, so it can be vectorized
+			mask = rank == r
+			self._update(rows[mask], sales[mask])
+		return self
+
+	def _update(self, rows, values):
+		count = self._count[rows]
+		pos = count % self.long_window
+		short_pos = (count - self.short_window) % self.long_window
+		evicted_long = np.where(count >= self.long_window, self._window[rows, pos], 0)
+		evicted_short = np.where(count >= self.short_window, self._window[rows, short_pos], 0)
+		self._window[rows, pos] = values
+		self._long_sum[rows] += values - evicted_long
+		self._short_sum[rows] += values - evicted_short
+		self._count[rows] = count + 1
+
+	def trends(self):
+		"""detect_trends()-compatible dict for products with a full long window"""
+		n = len(self._products)
+		count = self._count[:n]
+		ready = np.flatnonzero(count >= self.long_window)
+		short_ma = self._short_sum[ready] / self.short_window
+		long_ma = self._long_sum[ready] / self.long_window
+		with np.errstate(divide="ignore", invalid="ignore"):
+			scores = np.where(long_ma > 0, (short_ma - long_ma) / long_ma, 0.0)
+		latest = self._window[ready, (count[ready] - 1) % self.long_window]
+		trends = {}
+		for i, row in enumerate(ready):
+			trend_status, trend_class = classify_trend(scores[i])
+			trends[self._products[row]] = {
+				'trend_score': scores[i],
+				'trend_status': trend_status,
+				'trend_class': trend_class,
+				'short_ma': short_ma[i],
+				'long_ma': long_ma[i],
+				'current_sales': latest[i]
+			}
+		return trends
+
+
+@timed("detect_trends")
+def detect_trends(data, short_window=3, long_window=5):
+	"""One-shot trend detection over a history frame with timestamp/product/sales columns"""
+	dtype = "int64" if pd.api.types.is_integer_dtype(data['sales']) else "float64"
+	engine = TrendEngine(short_window, long_window, dtype=dtype)
+	# products in first-appearance order, then only the points the windows can see
+	engine._rows(data['product'].unique())
+	recent = data.sort_values('timestamp', kind="stable").groupby('product', sort=False, observed=True).tail(long_window)
+	return engine.observe(recent['product'].to_numpy(), recent['sales'].to_numpy()).trends()
@@ -0,0 +1,166 @@
+from bisect import bisect_left, insort
+
+import numpy as np
+import pandas as pd
+
+from .schema import apply_schema, week_ordinal
+
+WEEKLY_COLUMNS = ["product", "week", "sales", "views", "price", "category",
+	"view_to_purchase", "sales_pct_change", "trend_score"]
+
+
+def _median(prices):
+	"""Exact median of a {price: count} table, as pandas computes it"""
+	total = sum(prices.values())
+	if total == 0:
+		return np.nan
+	lo, hi = (total - 1) // 2, total // 2
+	seen = 0
+	lo_value = None
+	for price in sorted(prices):
+		seen += prices[price]
+		if lo_value is None and lo < seen:
+			lo_value = price
+		if hi < seen:
+			return (lo_value + price) / 2
+
+
+class _Cell:
+	__slots__ = ("sales", "views", "category", "prices", "price", "pct")
+
+	def __init__(self):
+		self.sales = 0
+		self.views = 0
+		self.category = None
+		self.prices = {}
+		self.price = np.nan
+		self.pct = 0.0
+
+
+class WeeklyRollup:
+	"""compute_weekly() maintained incrementally as new sales rows arrive.
+
+	Each product-week keeps its sales/views sums, first category and a
+	{price: count} table from which the exact median is recomputed, so an
+	update only touches the product-weeks present in the new rows and the
+	week that follows each of them (whose week-over-week change depends on
+	it). `frame()` returns the same table as compute_weekly() over all rows
+	seen so far.
+	"""
+
+	def __init__(self, rows=None):
+		self._cells = {}
+		self._weeks = {}
+		self._frame = None
+		self.version = 0
+		if rows is not None:
+			self.update(rows)
+
+	def __len__(self):
+		return len(self._cells)
+
+	def __contains__(self, product):
+		return product in self._weeks
+
+	@property
+	def products(self):
+		return list(self._weeks)
+
+	def update(self, rows):
+		"""Fold a batch of sales rows into the rollup; returns the product-weeks that changed"""
+		batch = pd.DataFrame(rows)
+		if batch.empty:
+			return self._to_frame([])
+		if "week" not in batch.columns:
+			time_column = "date" if "date" in batch.columns else "timestamp"
+			batch["week"] = week_ordinal(pd.to_datetime(batch[time_column]))
+		if "category" not in batch.columns:
+			batch["category"] = None
+		keys = ["product", "week"]
+		sums = (batch.groupby(keys, observed=True, sort=False)
+			.agg(sales=("sales", "sum"),
+				 views=("views", "sum"),
+				 category=("category", "first")))
+		prices = batch.groupby(keys + ["price"], observed=True, sort=False).size()
+
+		# plain Python scalars from here on; the loops below are per product-week of the batch
+		touched = list(zip(sums.index.get_level_values("product").tolist(),
+			sums.index.get_level_values("week").tolist()))
+		for key, sales, views, category in zip(
+				touched, sums["sales"].tolist(), sums["views"].tolist(), sums["category"].tolist()):
+			cell = self._cells.get(key)
+			if cell is None:
+				cell = self._cells[key] = _Cell()
+				insort(self._weeks.setdefault(key[0], []), key[1])
+			cell.sales += sales
+			cell.views += views
+			if cell.category is None and not pd.isna(category):
+				cell.category = category
+		for product, week, price, n in zip(prices.index.get_level_values("product").tolist(),
+				prices.index.get_level_values("week").tolist(),
+				prices.index.get_level_values("price").tolist(), prices.tolist()):
+			cell_prices = self._cells[(product, week)].prices
+			cell_prices[price] = cell_prices.get(price, 0) + n
+
+		changed = set(touched)
+		for product, week in touched:
+			cell = self._cells[(product, week)]
+			cell.price = _median(cell.prices)
+			# the following week's change is relative to this one
+			weeks = self._weeks[product]
+			i = bisect_left(weeks, week)
+			if i + 1 < len(weeks):
+				changed.add((product, weeks[i + 1]))
+		for product, week in changed:
+			self._update_pct(product, week)
+
+		self._frame = None
+		self.version += 1
+		return self._to_frame(sorted(changed))
+
+	def _update_pct(self, product, week):
+		weeks = self._weeks[product]
+		i = bisect_left(weeks, week)
+		cell = self._cells[(product, week)]
+		if i == 0:
+			cell.pct = 0.0
+			return
+		prev = self._cells[(product, weeks[i - 1])].sales
+		if prev:
+			cell.pct = cell.sales / prev - 1.0
+		else:
+			# sales / 0 - 1 as add_trend_columns computes it: +/-inf, or NaN -> 0 for 0 / 0
+			cell.pct = float(np.sign(cell.sales)) * np.inf if cell.sales else 0.0
+
+	def frame(self):
+		"""The full weekly table, sorted by (product, week); cached until the next update"""
+		if self._frame is None:
+			keys = [(product, week) for product in sorted(self._weeks) for week in self._weeks[product]]
+			self._frame = self._to_frame(keys)
+		return self._frame
+
+	def rows(self, product):
+		"""Weekly rows of one product, sorted by week"""
+		return self._to_frame([(product, week) for week in self._weeks.get(product, [])])
+
+	def _to_frame(self, keys):
+		cells = [self._cells[key] for key in keys]
+		sales = np.array([c.sales for c in cells], dtype=np.int64)
+		views = np.array([c.views for c in cells], dtype=np.int64)
+		with np.errstate(divide="ignore", invalid="ignore"):
+			view_to_purchase = np.where(sales > 0, views / sales, np.nan)
+		pct = np.array([c.pct for c in cells], dtype=np.float64)
+		products = [p for p, _ in keys]
+		categories = [c.category for c in cells]
+		weekly = pd.DataFrame({
+			"product": pd.Categorical(products, categories=sorted(set(products))),
+			"week": np.array([w for _, w in keys], dtype=np.int64),
+			"sales": sales,
+			"views": views,
+			"price": np.array([c.price for c in cells], dtype=np.float64),
+			"category": pd.Categorical(categories, categories=sorted(set(categories) - {None})),
+			"view_to_purchase": view_to_purchase,
+			"sales_pct_change": pct,
+			"trend_score": pct,
+		}, columns=WEEKLY_COLUMNS)
+		return apply_schema(weekly)
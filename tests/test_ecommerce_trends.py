@@ -0,0 +1,95 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.src.ecommerce_trends import compute_weekly, load_data
+
+
+def legacy_compute_weekly(df):
+	"""compute_weekly as it was before vectorization (row-wise apply, groupby pct_change)"""
+	weekly = (df.groupby(["product","week"], as_index=False)
+		.agg(sales=("sales","sum"),
+			 views=("views","sum"),
+			 price=("price","median"),
+			 category=("category","first")))
+	weekly = weekly.sort_values(["product","week"])
+	weekly["view_to_purchase"] = weekly.apply(
+		lambda r: (r["views"]/r["sales"]) if r["sales"] > 0 else None, axis=1
+	)
+	weekly["sales_pct_change"] = weekly.groupby("product")["sales"].pct_change().fillna(0.0)
+	weekly["trend_score"] = weekly["sales_pct_change"]
+	return weekly
+
+
+def sales_frame(rows):
+	df = pd.DataFrame(rows, columns=["product", "week", "sales", "views", "price"])
+	df["category"] = "Electronics"
+	return df
+
+
+@pytest.fixture
+def edge_cases():
+	return sales_frame([
+		# 10 -> 0 -> 5: a zero-sales week, then growth from zero
+		("A", 1, 6, 60, 10.0), ("A", 1, 4, 40, 12.0),
+		("A", 2, 0, 30, 11.0),
+		("A", 3, 5, 25, 11.0),
+		# 0 -> 0 -> 8: no change while both are zero
+		("B", 1, 0, 10, 5.0),
+		("B", 2, 0, 0, 5.0),
+		("B", 3, 8, 80, 5.0),
+		# 20 -> 10: a decline
+		("C", 2, 20, 100, 3.0),
+		("C", 3, 10, 90, 3.5),
+	])
+
+
+def test_matches_legacy_implementation(edge_cases):
+	expected = legacy_compute_weekly(edge_cases).reset_index(drop=True)
+	actual = compute_weekly(edge_cases).reset_index(drop=True)
+	for column in ["product", "week", "sales", "views", "price", "category"]:
+		pd.testing.assert_series_equal(actual[column], expected[column], check_dtype=False)
+	for column in ["view_to_purchase", "sales_pct_change", "trend_score"]:
+		pd.testing.assert_series_equal(actual[column].astype("float64"), expected[column].astype("float64"))
+
+
+def test_masked_division_semantics(edge_cases):
+	weekly = compute_weekly(edge_cases).set_index(["product", "week"])
+	# no sales: view_to_purchase is undefined
+	assert np.isnan(weekly.loc[("A", 2), "view_to_purchase"])
+	assert np.isnan(weekly.loc[("B", 1), "view_to_purchase"])
+	assert weekly.loc[("A", 1), "view_to_purchase"] == 10.0
+	# growth from a zero-sales week is +inf, a drop to zero is -100%
+	assert weekly.loc[("A", 3), "sales_pct_change"] == np.inf
+	assert weekly.loc[("B", 3), "sales_pct_change"] == np.inf
+	assert weekly.loc[("A", 2), "sales_pct_change"] == -1.0
+	# 0 -> 0 and each product's first week count as no change
+	assert weekly.loc[("B", 2), "sales_pct_change"] == 0.0
+	assert weekly.loc[("A", 1), "sales_pct_change"] == 0.0
+	assert weekly.loc[("C", 2), "sales_pct_change"] == 0.0
+	assert weekly.loc[("C", 3), "sales_pct_change"] == -0.5
+	pd.testing.assert_series_equal(weekly["trend_score"], weekly["sales_pct_change"], check_names=False)
+
+
+def test_matches_legacy_on_sample_data():
+	path = os.path.join(os.path.dirname(__file__), "..", "data", "sample_sales.csv")
+	df = pd.read_csv(path, parse_dates=["date"])
+	df["week"] = df["date"].dt.to_period("W").astype(str)
+	expected = legacy_compute_weekly(df).reset_index(drop=True)
+	actual = compute_weekly(df).reset_index(drop=True)
+	for column in ["sales", "views", "view_to_purchase", "sales_pct_change"]:
+		pd.testing.assert_series_equal(actual[column].astype("float64"), expected[column].astype("float64"))
+
+
+def test_loaded_prices_are_exact():
+	path = os.path.join(os.path.dirname(__file__), "..", "data", "sample_sales.csv")
+	raw = pd.read_csv(path)
+	df = load_data(path)
+	# cent prices and revenue come back as written, not widened from float32
+	np.testing.assert_array_equal(df["price"].to_numpy(), raw["price"].to_numpy())
+	np.testing.assert_array_equal((df["sales"] * df["price"]).to_numpy(), (raw["sales"] * raw["price"]).to_numpy())
+	assert compute_weekly(df)["price"].isin(raw["price"]).all()
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.src import parallel_weekly
+from src.src.benchmark import make_sales_dataset
+from src.src.ecommerce_trends import compute_weekly, load_data
+from src.src.parallel_weekly import compute_weekly_parallel
+
+
+@pytest.fixture
+def shared_blocks(monkeypatch):
+	"""Records every shared-memory block the parallel path creates"""
+	created = []
+	to_shared = parallel_weekly._to_shared
+
+	def recording(arrays):
+		block, layout = to_shared(arrays)
+		created.append(layout)
+		return block, layout
+
+	monkeypatch.setattr(parallel_weekly, "_to_shared", recording)
+	return created
+
+
+def synthetic_sales(tmp_path):
+	path = tmp_path / "sales.csv"
+	make_sales_dataset(60, n_weeks=12, rows_per_week=4, seed=3).to_csv(path, index=False)
+	return load_data(path)
+
+
+def test_parallel_matches_compute_weekly(tmp_path, shared_blocks):
+	df = synthetic_sales(tmp_path)
+	actual = compute_weekly_parallel(df, workers=2, min_rows=1)
+	assert len(shared_blocks) == 1
+	pd.testing.assert_frame_equal(actual, compute_weekly(df))
+
+
+def test_parallel_matches_on_sample_data(shared_blocks):
+	df = load_data(os.path.join(os.path.dirname(__file__), "..", "data", "sample_sales.csv"))
+	actual = compute_weekly_parallel(df, workers=2, min_rows=1)
+	assert len(shared_blocks) == 1
+	pd.testing.assert_frame_equal(actual, compute_weekly(df))
+
+
+def test_small_inputs_take_the_serial_path(tmp_path, shared_blocks):
+	df = synthetic_sales(tmp_path)
+	pd.testing.assert_frame_equal(compute_weekly_parallel(df, workers=2), compute_weekly(df))
+	assert shared_blocks == []
@@ -0,0 +1,88 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.src.trend_engine import TrendEngine, detect_trends
+
+
+def legacy_detect_trends(data):
+	"""detect_trends as it was in the final dashboard (full rescan per product)"""
+	trends = {}
+	for product in data['product'].unique():
+		product_data = data[data['product'] == product].sort_values('timestamp')
+		if len(product_data) >= 5:
+			sales_series = product_data['sales'].values
+			short_ma = np.mean(sales_series[-3:]) if len(sales_series) >= 3 else sales_series[-1]
+			long_ma = np.mean(sales_series[-5:]) if len(sales_series) >= 5 else sales_series[-1]
+			trend_score = (short_ma - long_ma) / long_ma if long_ma > 0 else 0
+			if trend_score > 0.2:
+				trend_status, trend_class = "🚀 Rapid Growth", "trend-up"
+			elif trend_score > 0.05:
+				trend_status, trend_class = "📈 Growing", "trend-up"
+			elif trend_score < -0.2:
+				trend_status, trend_class = "📉 Rapid Decline", "trend-down"
+			elif trend_score < -0.05:
+				trend_status, trend_class = "🔻 Declining", "trend-down"
+			else:
+				trend_status, trend_class = "➡️ Stable", "trend-neutral"
+			trends[product] = {
+				'trend_score': trend_score,
+				'trend_status': trend_status,
+				'trend_class': trend_class,
+				'short_ma': short_ma,
+				'long_ma': long_ma,
+				'current_sales': sales_series[-1]
+			}
+	return trends
+
+
+def tick_stream(n_ticks=40, n_products=12, seed=7):
+	"""Seeded ticks: a random subset of products per tick, each at most once, one timestamp per tick"""
+	rng = np.random.default_rng(seed)
+	products = np.array([f"Product {i:02d}" for i in range(n_products)], dtype=object)
+	level = rng.uniform(0, 30, n_products)
+	level[0] = 0  # never sells: long_ma stays 0
+	start = pd.Timestamp("2025-01-01 09:00")
+	for tick in range(n_ticks):
+		chosen = np.sort(rng.choice(n_products, rng.integers(1, n_products + 1), replace=False))
+		yield pd.DataFrame({
+			'timestamp': start + pd.Timedelta(seconds=10 * tick),
+			'product': products[chosen],
+			'sales': rng.poisson(level[chosen] * rng.uniform(0.5, 1.5)),
+		})
+
+
+def assert_same_trends(actual, expected):
+	assert list(actual) == list(expected)
+	for product, fields in expected.items():
+		assert actual[product] == fields, product
+
+
+@pytest.fixture
+def ticks():
+	return list(tick_stream())
+
+
+def test_engine_matches_legacy_tick_by_tick(ticks):
+	engine = TrendEngine(short_window=3, long_window=5)
+	history = []
+	for tick in ticks:
+		history.append(tick)
+		engine.observe(tick['product'], tick['sales'])
+		assert_same_trends(engine.trends(), legacy_detect_trends(pd.concat(history, ignore_index=True)))
+
+
+def test_detect_trends_matches_legacy(ticks):
+	for end in (5, 20, len(ticks)):
+		history = pd.concat(ticks[:end], ignore_index=True)
+		assert_same_trends(detect_trends(history), legacy_detect_trends(history))
+
+
+def test_detect_trends_ignores_row_order(ticks):
+	history = pd.concat(ticks, ignore_index=True)
+	shuffled = history.sample(frac=1, random_state=0)
+	assert_same_trends(detect_trends(shuffled), legacy_detect_trends(shuffled))
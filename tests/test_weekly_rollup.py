@@ -0,0 +1,55 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.src.benchmark import make_sales_dataset
+from src.src.ecommerce_trends import compute_weekly, load_data
+from src.src.weekly_rollup import WeeklyRollup
+
+
+@pytest.fixture
+def sales(tmp_path):
+	path = tmp_path / "sales.csv"
+	df = make_sales_dataset(30, n_weeks=10, rows_per_week=5, seed=11)
+	# a few weeks with no sales, for zero-division in the trend columns
+	df.loc[df.index % 17 == 0, "sales"] = 0
+	df.to_csv(path, index=False)
+	return load_data(path)
+
+
+def rollup_in_batches(df, n_batches, seed):
+	shuffled = df.sample(frac=1, random_state=seed)
+	rollup = WeeklyRollup()
+	for batch in np.array_split(np.arange(len(shuffled)), n_batches):
+		rollup.update(shuffled.iloc[batch])
+	return rollup
+
+
+def test_incremental_updates_match_compute_weekly(sales):
+	expected = compute_weekly(sales)
+	for n_batches, seed in [(1, 0), (7, 1), (40, 2)]:
+		actual = rollup_in_batches(sales, n_batches, seed).frame()
+		pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_weighted_median_price(sales):
+	# repeat prices unevenly so medians come from counts, with even-sized weeks averaging two prices
+	heavy = pd.concat([sales, sales.iloc[::3], sales.iloc[::4]], ignore_index=True)
+	expected = compute_weekly(heavy)
+	actual = rollup_in_batches(heavy, 9, 3).frame()
+	pd.testing.assert_series_equal(actual["price"], expected["price"])
+	assert (heavy.groupby(["product", "week"], observed=True).size() % 2 == 0).any()
+
+
+def test_update_reports_changed_weeks(sales):
+	weeks = np.sort(sales["week"].unique())
+	late = (sales["week"] == weeks[3]) & (sales["product"] == sales["product"].iloc[0])
+	rollup = WeeklyRollup(sales[~late])
+	changed = rollup.update(sales[late])
+	# the inserted week and the week after it, whose week-over-week change moved
+	assert changed["week"].tolist() == [weeks[3], weeks[4]]
+	pd.testing.assert_frame_equal(rollup.frame(), compute_weekly(sales))